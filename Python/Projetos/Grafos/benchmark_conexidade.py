@@ -0,0 +1,141 @@
+"""
+Benchmark das componentes fortemente conexas do menu (grafo.txt).
+
+Compara o Tarjan iterativo (pilha explícita) de GrafoListaAdj com o
+Kosaraju recursivo anterior em dois cenários:
+- aleatorio: dígrafo com n vértices e m arestas sorteadas
+- cadeia: caminho 1 -> 2 -> ... -> n (profundidade máxima de DFS)
+
+A versão recursiva roda numa thread com pilha grande e limite de recursão
+elevado; se mesmo assim estourar, o tempo aparece como "falhou".
+
+Uso:
+    python benchmark_conexidade.py [--vertices N] [--arestas M] [--semente S]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+from projeto_grafo_menu import GrafoListaAdj
+
+
+def fconex_recursivo(g: GrafoListaAdj) -> list[list[int]]:
+    """Kosaraju recursivo (implementação anterior, usada como referência)."""
+    vis: set[int] = set()
+    ordem: list[int] = []
+
+    def dfs1(u: int) -> None:
+        vis.add(u)
+        for v in g.adj.get(u, {}):
+            if v not in vis:
+                dfs1(v)
+        ordem.append(u)
+
+    for u in g.vertices:
+        if u not in vis:
+            dfs1(u)
+
+    rev: dict[int, list[int]] = {u: [] for u in g.vertices}
+    for u in g.adj:
+        for v in g.adj[u]:
+            rev[v].append(u)
+
+    vis.clear()
+    comps: list[list[int]] = []
+
+    def dfs2(u: int, comp: list[int]) -> None:
+        vis.add(u)
+        comp.append(u)
+        for v in rev.get(u, []):
+            if v not in vis:
+                dfs2(v, comp)
+
+    for u in reversed(ordem):
+        if u not in vis:
+            comp: list[int] = []
+            dfs2(u, comp)
+            comps.append(sorted(comp))
+    return comps
+
+
+def grafo_aleatorio(n: int, m: int, semente: int) -> GrafoListaAdj:
+    rng = random.Random(semente)
+    g = GrafoListaAdj()
+    g.tipo = 4
+    for v in range(1, n + 1):
+        g.inserir_vertice(v, f"V{v}")
+    for _ in range(m):
+        g.inserir_aresta(rng.randint(1, n), rng.randint(1, n))
+    return g
+
+
+def grafo_cadeia(n: int) -> GrafoListaAdj:
+    g = GrafoListaAdj()
+    g.tipo = 4
+    for v in range(1, n + 1):
+        g.inserir_vertice(v, f"V{v}")
+    for v in range(1, n):
+        g.inserir_aresta(v, v + 1)
+    return g
+
+
+def medir_recursivo(g: GrafoListaAdj) -> tuple[float | None, list[list[int]] | None]:
+    """Executa a versão recursiva numa thread com pilha de 512 MB."""
+    resultado: dict[str, object] = {}
+
+    def alvo() -> None:
+        try:
+            t0 = time.perf_counter()
+            resultado["comps"] = fconex_recursivo(g)
+            resultado["tempo"] = time.perf_counter() - t0
+        except RecursionError:
+            pass
+
+    limite = sys.getrecursionlimit()
+    tamanho_pilha = threading.stack_size(512 * 1024 * 1024)
+    sys.setrecursionlimit(max(limite, 4 * len(g.vertices) + 1000))
+    try:
+        t = threading.Thread(target=alvo)
+        t.start()
+        t.join()
+    finally:
+        sys.setrecursionlimit(limite)
+        threading.stack_size(tamanho_pilha)
+    return resultado.get("tempo"), resultado.get("comps")
+
+
+def comparar(nome: str, g: GrafoListaAdj) -> None:
+    t0 = time.perf_counter()
+    comps, _ = g._componentes_fortemente_conexas()
+    t_iter = time.perf_counter() - t0
+
+    t_rec, comps_rec = medir_recursivo(g)
+    if comps_rec is not None and comps_rec != comps:
+        raise SystemExit(f"[{nome}] componentes divergentes entre as versões")
+
+    rec = f"{t_rec:8.2f} s" if t_rec is not None else "  falhou"
+    ganho = f"{t_rec / t_iter:5.1f}x" if t_rec is not None and t_iter > 0 else "    -"
+    print(
+        f"{nome:<10} V={len(g.vertices):>9,} E={g.numero_arestas():>10,} "
+        f"FCONEX={len(comps):>9,} | iterativo {t_iter:8.2f} s | recursivo {rec} | {ganho}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vertices", type=int, default=200_000)
+    parser.add_argument("--arestas", type=int, default=1_000_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    comparar("aleatorio", grafo_aleatorio(args.vertices, args.arestas, args.semente))
+    comparar("cadeia", grafo_cadeia(args.vertices))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,11 @@ import unicodedata
 from pathlib import Path
 import re
 
+import numpy as np
 import pandas as pd
 
+from src.geometria import GeometriaDistritos
+
 SCRIPT_DIR = Path(__file__).parent
 DATA_DIR = SCRIPT_DIR / "data"
 
@@ -28,6 +31,7 @@ ARQ_SERVICOS_CSV = DATA_DIR / "deinfosacadsau2014.csv"
 ARQ_POP_CSV = DATA_DIR / "evolucao_msp_pop_sexo_idade.csv"
 ARQ_UBS_MD = DATA_DIR / "Unid_Munic_Saude_Subp.md"
 ARQ_UBS_VERTICES = DATA_DIR / "ubs_vertices.json"
+ARQ_KML = DATA_DIR / "São Paulo.kml"
 
 ZONAS_MANTIDAS = {"Leste", "Norte", "Sul"}
 
@@ -146,11 +150,33 @@ def recortar_adjacencias(ids_mantidos: set[int]) -> list[dict]:
     return adj
 
 
+def geocodificar_distritos(saude: pd.DataFrame, caminho_kml: Path) -> pd.Series:
+    """
+    Distrito de cada estabelecimento a partir das coordenadas (LONG/LAT,
+    em milionésimos de grau) e dos polígonos do KML. Pontos fora de todos
+    os polígonos mantêm o distrito informado no CSV.
+    """
+    geometria = GeometriaDistritos.de_kml(caminho_kml)
+    lon = pd.to_numeric(saude["LONG"], errors="coerce").to_numpy(dtype=float) / 1e6
+    lat = pd.to_numeric(saude["LAT"], errors="coerce").to_numpy(dtype=float) / 1e6
+
+    poligonos = geometria.localizar(lon, lat)
+    nomes = np.array(geometria.nomes + [""], dtype=object)
+    return pd.Series(
+        np.where(poligonos >= 0, nomes[poligonos], saude["DISTRITO"].to_numpy()),
+        index=saude.index,
+    )
+
+
 def gerar_servicos_reais(ids_por_nome_norm: dict[str, int]) -> list[dict]:
     saude = ler_csv_com_fallback(ARQ_SERVICOS_CSV)
     saude.columns = [normalizar_texto(c) for c in saude.columns]
 
     saude["DISTRITO"] = saude["DISTRITO"].map(normalizar_texto)
+    if ARQ_KML.exists():
+        geocodificado = geocodificar_distritos(saude, ARQ_KML)
+        print(f"   Distritos corrigidos pelo KML: {int((geocodificado != saude['DISTRITO']).sum())}")
+        saude["DISTRITO"] = geocodificado
     saude["TIPO_GRUPO"] = saude.apply(
         lambda row: mapear_tipo_servico(row["TIPO"], row["CLASSE"], row["ESTABELECI"]),
         axis=1,
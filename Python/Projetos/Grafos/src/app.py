@@ -10,8 +10,6 @@ Uso:
 
 import sys
 from pathlib import Path
-import xml.etree.ElementTree as ET
-import unicodedata
 
 import streamlit as st
 import plotly.express as px
@@ -24,6 +22,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from src.grafo import GrafoSP
 from src.metricas import MetricasAcessibilidade
+from src.otimizacao import OtimizadorLocalizacao
+from src.capacidade import AcessibilidadeCapacidade, RAIO_PADRAO_KM
+from src.geometria import GeometriaDistritos, carregar_geometria, normalizar_nome
 
 # ============================================================================
 # Configuração da Página
@@ -84,15 +85,6 @@ NOMES_SERVICO = {
 }
 
 
-def normalizar_nome(valor: str) -> str:
-    texto = str(valor).strip().upper()
-    texto = "".join(
-        c for c in unicodedata.normalize("NFKD", texto)
-        if not unicodedata.combining(c)
-    )
-    return texto
-
-
 def hex_para_rgba(cor_hex: str, alpha: float) -> str:
     cor = cor_hex.lstrip("#")
     if len(cor) != 6:
@@ -103,64 +95,6 @@ def hex_para_rgba(cor_hex: str, alpha: float) -> str:
     return f"rgba({r},{g},{b},{alpha})"
 
 
-def area_anel(anel: list[tuple[float, float]]) -> float:
-    """Área assinada aproximada de anel (lon/lat)."""
-    if len(anel) < 3:
-        return 0.0
-    a = 0.0
-    for i in range(len(anel) - 1):
-        x1, y1 = anel[i]
-        x2, y2 = anel[i + 1]
-        a += (x1 * y2) - (x2 * y1)
-    return a / 2.0
-
-
-def ponto_em_poligono(x: float, y: float, poligono: list[tuple[float, float]]) -> bool:
-    """Teste simples de ponto no polígono (ray casting)."""
-    dentro = False
-    n = len(poligono)
-    if n < 3:
-        return False
-    j = n - 1
-    for i in range(n):
-        xi, yi = poligono[i]
-        xj, yj = poligono[j]
-        cond = ((yi > y) != (yj > y))
-        if cond:
-            x_inter = (xj - xi) * (y - yi) / ((yj - yi) if (yj - yi) != 0 else 1e-12) + xi
-            if x < x_inter:
-                dentro = not dentro
-        j = i
-    return dentro
-
-
-def ponto_representativo_anel(anel: list[tuple[float, float]]) -> tuple[float, float]:
-    """Retorna ponto representativo preferencialmente dentro do anel."""
-    if len(anel) < 3:
-        return (0.0, 0.0)
-
-    a = area_anel(anel)
-    if abs(a) < 1e-12:
-        return anel[len(anel) // 2]
-
-    cx_num = 0.0
-    cy_num = 0.0
-    for i in range(len(anel) - 1):
-        x1, y1 = anel[i]
-        x2, y2 = anel[i + 1]
-        cross = (x1 * y2) - (x2 * y1)
-        cx_num += (x1 + x2) * cross
-        cy_num += (y1 + y2) * cross
-
-    cx = cx_num / (6.0 * a)
-    cy = cy_num / (6.0 * a)
-
-    if ponto_em_poligono(cx, cy, anel):
-        return (cx, cy)
-
-    # fallback robusto: ponto de um vértice (sempre no contorno do distrito)
-    return anel[len(anel) // 2]
-
 # ============================================================================
 # Cache de Dados
 # ============================================================================
@@ -169,7 +103,26 @@ def ponto_representativo_anel(anel: list[tuple[float, float]]) -> tuple[float, f
 def carregar_grafo():
     """Carrega e constrói o grafo (executado apenas uma vez)."""
     data_dir = Path(__file__).resolve().parent.parent / "data"
-    return GrafoSP(data_dir=data_dir)
+    snapshot = data_dir / "grafo.npz"
+    fontes = [data_dir / n for n in ("ubs_vertices.json", "adjacencias.json", "servicos.json")]
+
+    # Snapshot binário só é usado se for mais novo que os JSON de origem
+    if snapshot.exists() and all(
+        snapshot.stat().st_mtime >= f.stat().st_mtime for f in fontes if f.exists()
+    ):
+        try:
+            return GrafoSP.carregar_snapshot(snapshot)
+        except ValueError:
+            pass
+
+    grafo = GrafoSP(data_dir=data_dir)
+    try:
+        grafo.salvar_snapshot(snapshot)
+    except Exception:
+        # O snapshot é só um atalho para a próxima inicialização: se não
+        # puder ser gravado, segue com o grafo montado a partir dos JSON
+        pass
+    return grafo
 
 
 @st.cache_resource
@@ -178,67 +131,102 @@ def carregar_metricas(_grafo):
     return MetricasAcessibilidade(_grafo)
 
 
-@st.cache_data
-def carregar_poligonos_kml(caminho_kml: Path) -> dict[str, list[list[tuple[float, float]]]]:
-    """Carrega polígonos distritais a partir de KML (nome -> lista de anéis)."""
-    if not caminho_kml.exists():
-        return {}
-
-    ns = {"kml": "http://www.opengis.net/kml/2.2"}
-    root = ET.parse(caminho_kml).getroot()
-    poligonos: dict[str, list[list[tuple[float, float]]]] = {}
-
-    for placemark in root.findall(".//kml:Placemark", ns):
-        nome = placemark.findtext("kml:name", default="", namespaces=ns)
-        nome_norm = normalizar_nome(nome)
-
-        aneis: list[list[tuple[float, float]]] = []
-        for coord_node in placemark.findall(
-            ".//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates", ns
-        ):
-            txt = (coord_node.text or "").strip()
-            if not txt:
-                continue
-
-            pontos: list[tuple[float, float]] = []
-            for token in txt.replace("\n", " ").split():
-                partes = token.split(",")
-                if len(partes) < 2:
-                    continue
-                try:
-                    lon = float(partes[0])
-                    lat = float(partes[1])
-                    pontos.append((lon, lat))
-                except ValueError:
-                    continue
-
-            if len(pontos) < 3:
-                continue
-
-            # Simplificação leve para reduzir custo de renderização
-            n = len(pontos)
-            passo = 1
-            if n > 2000:
-                passo = 8
-            elif n > 1000:
-                passo = 6
-            elif n > 600:
-                passo = 4
-            elif n > 300:
-                passo = 3
-            elif n > 150:
-                passo = 2
-
-            simplificado = pontos[::passo]
-            if simplificado[0] != simplificado[-1]:
-                simplificado.append(simplificado[0])
-
-            aneis.append(simplificado)
-
-        if aneis:
-            poligonos[nome_norm] = aneis
-
-    return poligonos
+@st.cache_resource
+def carregar_capacidade(_grafo):
+    """Inicializa o calculador de acessibilidade por capacidade (2SFCA)."""
+    return AcessibilidadeCapacidade(_grafo)
+
+
+@st.cache_resource
+def carregar_otimizador(_grafo):
+    """Inicializa o otimizador de localização de novos serviços."""
+    return OtimizadorLocalizacao(_grafo)
+
+
+@st.cache_data(max_entries=64)
+def escolher_locais(
+    tipo_servico: str, k: int, objetivo: str, raio_km: float, versao: int, _otimizador
+) -> list[dict]:
+    """
+    Resultado do otimizador por parâmetros e versão do grafo.
+
+    `versao` (GrafoSP.versao) entra só na chave: muda quando serviços ou
+    arestas são alterados, invalidando os resultados anteriores. O raio
+    só afeta o objetivo de cobertura.
+    """
+    return _otimizador.escolher_locais(tipo_servico, k, objetivo=objetivo, raio_km=raio_km)
+
+
+@st.cache_resource
+def carregar_geometria_mapa(caminho_kml: Path, _grafo) -> GeometriaDistritos:
+    """Geometria dos distritos (cache em disco, reaproveitada entre sessões)."""
+    geometria = carregar_geometria(caminho_kml)
+    geometria.associar_distritos({
+        normalizar_nome(info["nome"]): did
+        for did, info in _grafo.distritos.items()
+    })
+    return geometria
+
+
+@st.cache_resource
+def tracos_zonas_mapa(
+    caminho_kml: Path, nivel: int, _geometria: GeometriaDistritos, _grafo
+) -> list[dict]:
+    """
+    Polígonos agrupados por zona: um trace de desenho (anéis separados por
+    NaN, no nível de simplificação pedido) e um trace de hover/seleção.
+
+    O trace de hover usa sempre o nível mais simplificado mais o ponto de
+    rótulo de cada polígono, e leva o nome e o id do distrito por ponto;
+    assim o texto do hover não cresce com o detalhe do desenho. Montado uma
+    vez por nível; a cada interação só o destaque do selecionado é refeito.
+    """
+    plotados = np.flatnonzero(_geometria.distrito_ids >= 0)
+    zona_por_poligono = np.array(
+        [_grafo.distritos[int(did)]["zona"] for did in _geometria.distrito_ids[plotados]],
+        dtype=object,
+    )
+    nivel_hover = len(_geometria.tolerancias) - 1
+
+    # Coordenadas em float32 (enviadas em binário, suficiente para o desenho)
+    tracos = []
+    for zona in sorted(set(zona_por_poligono)):
+        poligonos = plotados[zona_por_poligono == zona]
+        xy, _ = _geometria.buffer_separado(poligonos, nivel)
+        xy = xy.astype(np.float32)
+        cor_zona = CORES_ZONA.get(zona, "#999999")
+        tracos.append(dict(
+            x=xy[:, 0],
+            y=xy[:, 1],
+            mode="lines",
+            fill="toself",
+            fillcolor=hex_para_rgba(cor_zona, 0.28),
+            line=dict(color=hex_para_rgba(cor_zona, 1.0), width=1.2),
+            hoverinfo="skip",
+            name=f"Zona {zona}",
+            legendgroup=f"zona_{zona}",
+            showlegend=True,
+        ))
+
+        # Hover por distrito: vértices do contorno simplificado + ponto interno
+        xy_h, dono = _geometria.buffer_separado(poligonos, nivel_hover)
+        validos = dono >= 0
+        xy_h = np.vstack([xy_h[validos], _geometria.pontos_label[poligonos]]).astype(np.float32)
+        dono = np.concatenate([dono[validos], poligonos])
+        ids = _geometria.distrito_ids[dono]
+        tracos.append(dict(
+            x=xy_h[:, 0],
+            y=xy_h[:, 1],
+            mode="markers",
+            marker=dict(size=6, color="rgba(0,0,0,0)"),
+            customdata=ids[:, None],
+            hovertext=[_grafo.distritos[int(did)]["nome"] for did in ids],
+            hovertemplate=f"<b>%{{hovertext}}</b><br>Zona: {zona}<extra></extra>",
+            name=f"Zona {zona}",
+            legendgroup=f"zona_{zona}",
+            showlegend=False,
+        ))
+    return tracos
 
 
 # ============================================================================
@@ -257,6 +245,8 @@ if not (data_dir / "ubs_vertices.json").exists():
 # Carregar dados
 grafo = carregar_grafo()
 metricas = carregar_metricas(grafo)
+otimizador = carregar_otimizador(grafo)
+capacidade = carregar_capacidade(grafo)
 
 # ============================================================================
 # Sidebar
@@ -322,10 +312,11 @@ st.markdown(
 )
 
 # Abas
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab_plan, tab4 = st.tabs([
     "🗺️ Visão Geral",
     "📍 Análise da UBS",
     "📊 Cobertura",
+    "🧮 Novos Serviços",
     "ℹ️ Sobre"
 ])
 
@@ -351,70 +342,91 @@ with tab1:
         )
 
         kml_path = data_dir / "São Paulo.kml"
-        poligonos_kml = carregar_poligonos_kml(kml_path)
+        geometria = carregar_geometria_mapa(kml_path, grafo)
 
         # Mapa interativo distrital (KML da cidade, sem fundo de ruas)
         fig_map = go.Figure()
 
-        ids_por_nome_norm = {
-            normalizar_nome(info["nome"]): did
-            for did, info in grafo.distritos.items()
-        }
+        poligonos_plotados = np.flatnonzero(geometria.distrito_ids >= 0)
 
-        # Plotar polígonos por distrito com cor por zona
-        zonas_legenda = set()
-        all_poly_lons: list[float] = []
-        all_poly_lats: list[float] = []
-        ponto_label_por_id: dict[int, tuple[float, float]] = {}
-        bounds_por_id: dict[int, tuple[float, float, float, float]] = {}
-        for nome_norm, aneis in poligonos_kml.items():
-            did = ids_por_nome_norm.get(nome_norm)
-            if did is None:
-                continue
-
-            info_d = grafo.distritos[did]
-            zona = info_d["zona"]
-            cor_zona = CORES_ZONA.get(zona, "#999999")
-            selecionado = did == distrito_id
-
-            # Geometria principal para labels/zoom
-            anel_principal = max(aneis, key=lambda r: abs(area_anel(r)))
-            ponto_x, ponto_y = ponto_representativo_anel(anel_principal)
-            ponto_label_por_id[did] = (ponto_x, ponto_y)
-            xs_princ = [p[0] for p in anel_principal]
-            ys_princ = [p[1] for p in anel_principal]
-            bounds_por_id[did] = (min(xs_princ), max(xs_princ), min(ys_princ), max(ys_princ))
-
-            for idx_anel, anel in enumerate(aneis):
-                xs = [p[0] for p in anel]
-                ys = [p[1] for p in anel]
-                all_poly_lons.extend(xs)
-                all_poly_lats.extend(ys)
-
-                fig_map.add_trace(go.Scattergl(
-                    x=xs,
-                    y=ys,
-                    mode="lines",
-                    fill="toself",
-                    fillcolor=hex_para_rgba("#f1c40f" if selecionado else cor_zona, 0.35 if selecionado else 0.28),
-                    line=dict(
-                        color="#7c5600" if selecionado else hex_para_rgba(cor_zona, 1.0),
-                        width=2.6 if selecionado else 1.2,
-                    ),
-                    customdata=[[did, info_d["nome"], zona]] * len(xs),
-                    hovertemplate="<b>%{customdata[1]}</b><br>Zona: %{customdata[2]}<extra></extra>",
-                    name=f"Zona {zona}",
-                    legendgroup=f"zona_{zona}",
-                    showlegend=(zona not in zonas_legenda and idx_anel == 0),
-                ))
-
-            zonas_legenda.add(zona)
+        # Geometria principal para labels/zoom (pré-calculada)
+        ids_plotados = geometria.distrito_ids[poligonos_plotados].tolist()
+        ponto_label_por_id: dict[int, tuple[float, float]] = dict(zip(
+            ids_plotados, map(tuple, geometria.pontos_label[poligonos_plotados].tolist())
+        ))
+        bounds_por_id: dict[int, tuple[float, float, float, float]] = dict(zip(
+            ids_plotados, map(tuple, geometria.limites[poligonos_plotados].tolist())
+        ))
 
         # Garantir ponto representativo para todos os distritos (fallback)
         for did in grafo.G.nodes():
             if did not in ponto_label_por_id:
                 ponto_label_por_id[did] = (grafo.distritos[did]["lon"], grafo.distritos[did]["lat"])
 
+        # Região de foco (selecionado + vizinhos)
+        ids_foco = [distrito_id] + list(grafo.G.neighbors(distrito_id))
+        xs_texto = [ponto_label_por_id.get(i, (grafo.distritos[i]["lon"], grafo.distritos[i]["lat"]))[0] for i in ids_foco]
+        ys_texto = [ponto_label_por_id.get(i, (grafo.distritos[i]["lon"], grafo.distritos[i]["lat"]))[1] for i in ids_foco]
+
+        # Zoom conforme modo selecionado
+        todos_lons = [grafo.distritos[n]["lon"] for n in grafo.G.nodes()]
+        todos_lats = [grafo.distritos[n]["lat"] for n in grafo.G.nodes()]
+
+        if modo_mapa == "Cidade inteira":
+            if poligonos_plotados.size:
+                limites_mapa = geometria.limites_poligono[poligonos_plotados]
+                xs_zoom = [limites_mapa[:, 0].min(), limites_mapa[:, 1].max()]
+                ys_zoom = [limites_mapa[:, 2].min(), limites_mapa[:, 3].max()]
+            else:
+                xs_zoom = todos_lons
+                ys_zoom = todos_lats
+            span_lon = max(xs_zoom) - min(xs_zoom)
+            span_lat = max(ys_zoom) - min(ys_zoom)
+            margem_lon = max(0.05, span_lon * 0.08)
+            margem_lat = max(0.04, span_lat * 0.08)
+            titulo_mapa = "Mapa Distrital de São Paulo — visão completa"
+        else:
+            xs_zoom = []
+            ys_zoom = []
+            for did_f in ids_foco:
+                if did_f in bounds_por_id:
+                    xmin, xmax, ymin, ymax = bounds_por_id[did_f]
+                    xs_zoom.extend([xmin, xmax])
+                    ys_zoom.extend([ymin, ymax])
+                else:
+                    xs_zoom.append(grafo.distritos[did_f]["lon"])
+                    ys_zoom.append(grafo.distritos[did_f]["lat"])
+            margem_lon = max(0.03, (max(xs_zoom) - min(xs_zoom)) * 0.45 if len(xs_zoom) > 1 else 0.05)
+            margem_lat = max(0.02, (max(ys_zoom) - min(ys_zoom)) * 0.45 if len(ys_zoom) > 1 else 0.04)
+            titulo_mapa = f"Mapa base (distritos) — foco em {distrito_selecionado_nome}"
+
+        # Nível de simplificação dos polígonos conforme a extensão visível
+        nivel_geo = geometria.nivel_para_extensao(
+            max(xs_zoom) - min(xs_zoom) + 2 * margem_lon,
+            max(ys_zoom) - min(ys_zoom) + 2 * margem_lat,
+        )
+
+        # Polígonos: um trace por zona (cacheado) + destaque do selecionado
+        for traco in tracos_zonas_mapa(kml_path, nivel_geo, geometria, grafo):
+            fig_map.add_trace(go.Scattergl(**traco))
+
+        poligonos_selecionado = np.flatnonzero(geometria.distrito_ids == distrito_id)
+        if poligonos_selecionado.size:
+            xy_sel, _ = geometria.buffer_separado(poligonos_selecionado, nivel_geo)
+            xy_sel = xy_sel.astype(np.float32)
+            fig_map.add_trace(go.Scattergl(
+                x=xy_sel[:, 0],
+                y=xy_sel[:, 1],
+                mode="lines",
+                fill="toself",
+                fillcolor=hex_para_rgba("#f1c40f", 0.35),
+                line=dict(color="#7c5600", width=2.6),
+                customdata=np.full((len(xy_sel), 1), distrito_id),
+                hovertemplate=f"<b>{distrito_selecionado_nome}</b><extra></extra>",
+                name=distrito_selecionado_nome,
+                showlegend=False,
+            ))
+
         # Estrutura do grafo (arestas + vértices)
         edge_x: list[float | None] = []
         edge_y: list[float | None] = []
@@ -454,38 +466,6 @@ with tab1:
             showlegend=True,
         ))
 
-        # Região de foco (selecionado + vizinhos)
-        ids_foco = [distrito_id] + list(grafo.G.neighbors(distrito_id))
-        xs_texto = [ponto_label_por_id.get(i, (grafo.distritos[i]["lon"], grafo.distritos[i]["lat"]))[0] for i in ids_foco]
-        ys_texto = [ponto_label_por_id.get(i, (grafo.distritos[i]["lon"], grafo.distritos[i]["lat"]))[1] for i in ids_foco]
-
-        # Zoom conforme modo selecionado
-        todos_lons = [grafo.distritos[n]["lon"] for n in grafo.G.nodes()]
-        todos_lats = [grafo.distritos[n]["lat"] for n in grafo.G.nodes()]
-
-        if modo_mapa == "Cidade inteira":
-            xs_zoom = all_poly_lons if all_poly_lons else todos_lons
-            ys_zoom = all_poly_lats if all_poly_lats else todos_lats
-            span_lon = max(xs_zoom) - min(xs_zoom)
-            span_lat = max(ys_zoom) - min(ys_zoom)
-            margem_lon = max(0.05, span_lon * 0.08)
-            margem_lat = max(0.04, span_lat * 0.08)
-            titulo_mapa = "Mapa Distrital de São Paulo — visão completa"
-        else:
-            xs_zoom = []
-            ys_zoom = []
-            for did_f in ids_foco:
-                if did_f in bounds_por_id:
-                    xmin, xmax, ymin, ymax = bounds_por_id[did_f]
-                    xs_zoom.extend([xmin, xmax])
-                    ys_zoom.extend([ymin, ymax])
-                else:
-                    xs_zoom.append(grafo.distritos[did_f]["lon"])
-                    ys_zoom.append(grafo.distritos[did_f]["lat"])
-            margem_lon = max(0.03, (max(xs_zoom) - min(xs_zoom)) * 0.45 if len(xs_zoom) > 1 else 0.05)
-            margem_lat = max(0.02, (max(ys_zoom) - min(ys_zoom)) * 0.45 if len(ys_zoom) > 1 else 0.04)
-            titulo_mapa = f"Mapa base (distritos) — foco em {distrito_selecionado_nome}"
-
         # Labels: cidade inteira -> só selecionado; foco local -> selecionado + vizinhos
         ids_labels = [distrito_id] if modo_mapa == "Cidade inteira" else ids_foco
         for did_lbl in ids_labels:
@@ -737,126 +717,269 @@ with tab2:
 with tab3:
     st.subheader(f"Ranking de Cobertura Territorial — {NOMES_SERVICO.get(tipo_servico, tipo_servico)}")
 
-    ranking_df = metricas.ranking(tipo_servico)
-    media = metricas.media_cidade(tipo_servico)
+    METRICAS_RANKING = {
+        "distancia": "Distância ao serviço mais próximo",
+        "2sfca": "Capacidade — 2SFCA",
+        "e2sfca": "Capacidade — E2SFCA (decaimento por faixas)",
+    }
+    metrica_ranking = st.radio(
+        "Métrica do ranking",
+        options=list(METRICAS_RANKING),
+        format_func=lambda m: METRICAS_RANKING[m],
+        horizontal=True,
+    )
 
-    # Métricas resumo
-    col1, col2, col3, col4, col5 = st.columns(5)
-    with col1:
-        st.metric("📏 Distância Ref. Média", f"{media['media_distancia']:.1f} km")
-    with col2:
-        st.metric("⭐ Índice Médio", f"{media['score_medio']:.0f}/100")
-    with col3:
-        st.metric("📐 Mediana", f"{media['mediana_distancia']:.1f} km")
-    with col4:
-        st.metric("✅ Melhor", f"{media['melhor_distancia']:.1f} km")
-    with col5:
-        st.metric("❌ Pior", f"{media['pior_distancia']:.1f} km")
+    if metrica_ranking == "distancia":
+        ranking_df = metricas.ranking(tipo_servico)
+        media = metricas.media_cidade(tipo_servico)
+
+        # Métricas resumo
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("📏 Distância Ref. Média", f"{media['media_distancia']:.1f} km")
+        with col2:
+            st.metric("⭐ Índice Médio", f"{media['score_medio']:.0f}/100")
+        with col3:
+            st.metric("📐 Mediana", f"{media['mediana_distancia']:.1f} km")
+        with col4:
+            st.metric("✅ Melhor", f"{media['melhor_distancia']:.1f} km")
+        with col5:
+            st.metric("❌ Pior", f"{media['pior_distancia']:.1f} km")
 
-    st.markdown("---")
+        st.markdown("---")
 
-    # Top 10 mais acessíveis e menos acessíveis
-    col_top, col_bottom = st.columns(2)
+        # Top 10 mais acessíveis e menos acessíveis
+        col_top, col_bottom = st.columns(2)
+
+        with col_top:
+            st.markdown("#### ✅ Top 10 — Melhor Cobertura")
+            top10 = ranking_df.head(10)
+
+            fig_top = px.bar(
+                top10,
+                x="distrito",
+                y="score",
+                color="zona",
+                color_discrete_map=CORES_ZONA,
+                title="Distritos com melhor cobertura territorial",
+                labels={"score": "Score", "distrito": "Distrito", "zona": "Zona"},
+            )
+            fig_top.update_layout(height=400, xaxis_tickangle=-45)
+            st.plotly_chart(fig_top, width="stretch")
+
+        with col_bottom:
+            st.markdown("#### ❌ Top 10 — Menor Cobertura")
+            bottom10 = ranking_df.tail(10).sort_values("score", ascending=True)
+
+            fig_bottom = px.bar(
+                bottom10,
+                x="distrito",
+                y="score",
+                color="zona",
+                color_discrete_map=CORES_ZONA,
+                title="Distritos com menor cobertura territorial",
+                labels={"score": "Score", "distrito": "Distrito", "zona": "Zona"},
+            )
+            fig_bottom.update_layout(height=400, xaxis_tickangle=-45)
+            st.plotly_chart(fig_bottom, width="stretch")
 
-    with col_top:
-        st.markdown("#### ✅ Top 10 — Melhor Cobertura")
-        top10 = ranking_df.head(10)
+        # Distritos com baixa cobertura
+        st.markdown("---")
+        st.markdown("#### 🚨 Distritos com Menor Cobertura")
+        st.markdown("Distritos no top 20% com maior distância de referência territorial.")
+
+        isolados = metricas.distritos_isolados(tipo_servico, percentil=0.8)
+        if isolados:
+            df_isolados = pd.DataFrame(isolados)
+            df_isolados.columns = [
+                "ID", "Distrito", "Zona", "População",
+                "Distância de Referência (km)", "Índice"
+            ]
+            st.dataframe(
+                df_isolados[["Distrito", "Zona", "População", "Distância de Referência (km)", "Índice"]],
+                width="stretch",
+                hide_index=True,
+            )
+        else:
+            st.info("Todos os distritos têm acesso razoável.")
 
-        fig_top = px.bar(
-            top10,
-            x="distrito",
+        # Gráfico de dispersão: População vs Score
+        st.markdown("---")
+        st.markdown("#### 📈 População vs. Cobertura Territorial")
+
+        fig_scatter = px.scatter(
+            ranking_df,
+            x="populacao",
             y="score",
             color="zona",
             color_discrete_map=CORES_ZONA,
-            title="Distritos com melhor cobertura territorial",
-            labels={"score": "Score", "distrito": "Distrito", "zona": "Zona"},
+            size="populacao",
+            hover_name="distrito",
+            title=f"Relação entre população e índice de cobertura ({tipo_servico})",
+            labels={
+                "populacao": "População",
+                "score": "Índice de Cobertura",
+                "zona": "Zona"
+            },
+        )
+        fig_scatter.add_hline(
+            y=media["score_medio"],
+            line_dash="dash",
+            line_color="red",
+            annotation_text=f"Média: {media['score_medio']:.0f}",
         )
-        fig_top.update_layout(height=400, xaxis_tickangle=-45)
-        st.plotly_chart(fig_top, width="stretch")
+        fig_scatter.update_layout(height=500)
+        st.plotly_chart(fig_scatter, width="stretch")
 
-    with col_bottom:
-        st.markdown("#### ❌ Top 10 — Menor Cobertura")
-        bottom10 = ranking_df.tail(10).sort_values("score", ascending=True)
+        # Tabela completa
+        st.markdown("---")
+        st.markdown("#### 📋 Ranking Completo")
 
-        fig_bottom = px.bar(
-            bottom10,
-            x="distrito",
-            y="score",
-            color="zona",
-            color_discrete_map=CORES_ZONA,
-            title="Distritos com menor cobertura territorial",
-            labels={"score": "Score", "distrito": "Distrito", "zona": "Zona"},
+        # Destacar distrito selecionado
+        ranking_display = ranking_df.copy()
+        ranking_display.columns = [
+            "Posição", "ID", "Distrito", "Zona",
+            "População", "Distância de Referência (km)", "Índice"
+        ]
+
+        st.dataframe(
+            ranking_display[["Posição", "Distrito", "Zona", "População",
+                             "Distância de Referência (km)", "Índice"]],
+            width="stretch",
+            hide_index=True,
+            height=400,
         )
-        fig_bottom.update_layout(height=400, xaxis_tickangle=-45)
-        st.plotly_chart(fig_bottom, width="stretch")
 
-    # Distritos com baixa cobertura
-    st.markdown("---")
-    st.markdown("#### 🚨 Distritos com Menor Cobertura")
-    st.markdown("Distritos no top 20% com maior distância de referência territorial.")
-
-    isolados = metricas.distritos_isolados(tipo_servico, percentil=0.8)
-    if isolados:
-        df_isolados = pd.DataFrame(isolados)
-        df_isolados.columns = [
-            "ID", "Distrito", "Zona", "População",
-            "Distância de Referência (km)", "Índice"
+    else:
+        raio_captacao = st.slider(
+            "Raio de captação (km)", min_value=2.0, max_value=30.0,
+            value=RAIO_PADRAO_KM, step=1.0,
+        )
+        resultado_cap = capacidade.calcular(tipo_servico, metrica_ranking, raio_captacao)
+        ranking_cap = resultado_cap["ranking"]
+        media_cap = resultado_cap["media"]
+        unidade_cap = f"{resultado_cap['unidade']} / mil hab."
+
+        st.markdown(
+            "Oferta do serviço (leitos, ou estabelecimentos quando o tipo não "
+            "registra leitos) dividida pela população que disputa essa oferta "
+            "dentro do raio de captação."
+        )
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("⚖️ Índice Médio", f"{media_cap['indice_medio']:.3f}", help=unidade_cap)
+        with col2:
+            st.metric("👥 Ponderado pela População", f"{media_cap['indice_ponderado']:.3f}", help=unidade_cap)
+        with col3:
+            st.metric("✅ Melhor", f"{media_cap['melhor_indice']:.3f}", help=unidade_cap)
+        with col4:
+            st.metric("🚫 Sem Oferta no Raio", f"{media_cap['sem_acesso']}")
+
+        st.markdown("---")
+
+        col_top, col_bottom = st.columns(2)
+        with col_top:
+            st.markdown("#### ✅ Top 10 — Maior Oferta por Habitante")
+            fig_top = px.bar(
+                ranking_cap.head(10),
+                x="distrito",
+                y="indice",
+                color="zona",
+                color_discrete_map=CORES_ZONA,
+                labels={"indice": unidade_cap, "distrito": "Distrito", "zona": "Zona"},
+            )
+            fig_top.update_layout(height=400, xaxis_tickangle=-45)
+            st.plotly_chart(fig_top, width="stretch")
+
+        with col_bottom:
+            st.markdown("#### ❌ Top 10 — Menor Oferta por Habitante")
+            fig_bottom = px.bar(
+                ranking_cap.tail(10).sort_values("indice", ascending=True),
+                x="distrito",
+                y="indice",
+                color="zona",
+                color_discrete_map=CORES_ZONA,
+                labels={"indice": unidade_cap, "distrito": "Distrito", "zona": "Zona"},
+            )
+            fig_bottom.update_layout(height=400, xaxis_tickangle=-45)
+            st.plotly_chart(fig_bottom, width="stretch")
+
+        st.markdown("---")
+        st.markdown("#### 📋 Ranking Completo")
+
+        ranking_display = ranking_cap.copy()
+        ranking_display.columns = [
+            "Posição", "ID", "Distrito", "Zona",
+            "População", f"Índice ({unidade_cap})", "Índice Relativo"
         ]
         st.dataframe(
-            df_isolados[["Distrito", "Zona", "População", "Distância de Referência (km)", "Índice"]],
+            ranking_display.drop(columns=["ID"]),
             width="stretch",
             hide_index=True,
+            height=400,
         )
-    else:
-        st.info("Todos os distritos têm acesso razoável.")
 
-    # Gráfico de dispersão: População vs Score
-    st.markdown("---")
-    st.markdown("#### 📈 População vs. Cobertura Territorial")
-
-    fig_scatter = px.scatter(
-        ranking_df,
-        x="populacao",
-        y="score",
-        color="zona",
-        color_discrete_map=CORES_ZONA,
-        size="populacao",
-        hover_name="distrito",
-        title=f"Relação entre população e índice de cobertura ({tipo_servico})",
-        labels={
-            "populacao": "População",
-            "score": "Índice de Cobertura",
-            "zona": "Zona"
-        },
-    )
-    fig_scatter.add_hline(
-        y=media["score_medio"],
-        line_dash="dash",
-        line_color="red",
-        annotation_text=f"Média: {media['score_medio']:.0f}",
+
+# ============================================================================
+# Tab Planejamento: Localização de Novos Serviços
+# ============================================================================
+
+with tab_plan:
+    st.subheader(f"Onde abrir novos serviços — {NOMES_SERVICO.get(tipo_servico, tipo_servico)}")
+    st.markdown(
+        "Escolha gulosa (CELF) dos distritos que mais melhoram a cobertura "
+        "ponderada pela população ao receber um novo serviço do tipo selecionado."
     )
-    fig_scatter.update_layout(height=500)
-    st.plotly_chart(fig_scatter, width="stretch")
 
-    # Tabela completa
-    st.markdown("---")
-    st.markdown("#### 📋 Ranking Completo")
-
-    # Destacar distrito selecionado
-    ranking_display = ranking_df.copy()
-    ranking_display.columns = [
-        "Posição", "ID", "Distrito", "Zona",
-        "População", "Distância de Referência (km)", "Índice"
-    ]
-
-    st.dataframe(
-        ranking_display[["Posição", "Distrito", "Zona", "População",
-                         "Distância de Referência (km)", "Índice"]],
-        width="stretch",
-        hide_index=True,
-        height=400,
+    col_k, col_obj, col_raio = st.columns(3)
+    with col_k:
+        k_locais = st.number_input("Número de novos locais", min_value=1, max_value=30, value=5, step=1)
+    with col_obj:
+        objetivo = st.radio(
+            "Objetivo",
+            options=["p_mediana", "cobertura"],
+            format_func=lambda x: "Reduzir distância (p-mediana)" if x == "p_mediana" else "Cobertura máxima",
+            horizontal=True,
+        )
+    with col_raio:
+        raio_cobertura = st.slider(
+            "Raio de cobertura (km)", min_value=1.0, max_value=20.0, value=5.0, step=0.5,
+            disabled=objetivo != "cobertura",
+        )
+
+    locais = escolher_locais(
+        tipo_servico,
+        int(k_locais),
+        objetivo,
+        float(raio_cobertura) if objetivo == "cobertura" else 0.0,
+        grafo.versao,
+        otimizador,
     )
 
+    if not locais:
+        st.info("Nenhum novo local melhora a cobertura com os parâmetros atuais.")
+    else:
+        rotulo_ganho = "Redução (hab·km)" if objetivo == "p_mediana" else "População coberta"
+        df_locais = pd.DataFrame(locais)
+        df_locais.insert(0, "ordem", range(1, len(df_locais) + 1))
+
+        fig_locais = px.bar(
+            df_locais,
+            x="distrito",
+            y="ganho",
+            color="zona",
+            color_discrete_map=CORES_ZONA,
+            title="Ganho marginal de cada novo local (na ordem de escolha)",
+            labels={"ganho": rotulo_ganho, "distrito": "Distrito", "zona": "Zona"},
+        )
+        fig_locais.update_layout(height=400, xaxis_tickangle=-45)
+        st.plotly_chart(fig_locais, width="stretch")
+
+        df_locais = df_locais[["ordem", "distrito", "zona", "ganho", "ganho_acumulado"]]
+        df_locais.columns = ["Ordem", "Distrito", "Zona", rotulo_ganho, "Acumulado"]
+        st.dataframe(df_locais, width="stretch", hide_index=True)
+
 
 # ============================================================================
 # Tab 4: Sobre
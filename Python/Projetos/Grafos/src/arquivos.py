@@ -0,0 +1,114 @@
+"""
+SPGraph - Gravação Atômica de Arquivos
+=======================================
+Um único caminho de gravação para tudo o que o projeto persiste (snapshot
+do grafo, matriz de distâncias, geometria e ranking exportado). O menu
+(projeto_grafo_menu.py) roda sem o pacote src e mantém uma cópia mínima
+deste esquema para o grafo.txt.
+
+O conteúdo vai para um temporário exclusivo (<arquivo>.<aleatório>.tmp) no
+mesmo diretório, é sincronizado com o disco e só então substitui o destino
+com os.replace. Uma falha no meio da
+gravação deixa o arquivo anterior intacto e não deixa o temporário para trás.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator
+
+
+@contextmanager
+def caminho_atomico(caminho: str | Path) -> Iterator[Path]:
+    """
+    Fornece um caminho temporário que substitui `caminho` ao fim do bloco.
+
+    Para escritores que abrem o arquivo por conta própria (pyarrow, csv
+    com caminho etc.). O temporário é sincronizado reabrindo-o para
+    escrita ("r+b"), o que também funciona no Windows.
+
+    Args:
+        caminho: Arquivo de destino.
+
+    Yields:
+        Caminho do temporário, exclusivo desta gravação.
+    """
+    caminho = Path(caminho)
+    fd, temporario = _criar_temporario(caminho)
+    os.close(fd)
+    try:
+        yield temporario
+        with open(temporario, "r+b") as f:
+            os.fsync(f.fileno())
+        _substituir(temporario, caminho)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+@contextmanager
+def escrita_atomica(caminho: str | Path, modo: str = "w", **kwargs) -> Iterator[IO]:
+    """
+    Abre um temporário para escrita que substitui `caminho` ao fim do bloco.
+
+    O fsync é feito no próprio handle de escrita, antes de fechá-lo.
+
+    Args:
+        caminho: Arquivo de destino.
+        modo: Modo de abertura ('w' ou 'wb').
+        **kwargs: Repassados a open() (encoding, newline, buffering...).
+
+    Yields:
+        Arquivo aberto sobre o temporário.
+    """
+    caminho = Path(caminho)
+    fd, temporario = _criar_temporario(caminho)
+    try:
+        with open(fd, modo, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        _substituir(temporario, caminho)
+    finally:
+        temporario.unlink(missing_ok=True)
+
+
+def _criar_temporario(caminho: Path) -> tuple[int, Path]:
+    """
+    Cria <nome>.<aleatório>.tmp no diretório do destino.
+
+    O nome é exclusivo (mkstemp), então gravações concorrentes no mesmo
+    destino (duas sessões do app, por exemplo) não compartilham o
+    temporário; a última a renomear vence.
+    """
+    fd, nome = tempfile.mkstemp(dir=caminho.parent, prefix=f"{caminho.name}.", suffix=".tmp")
+    temporario = Path(nome)
+    # mkstemp cria com permissão 0600; mantém a do arquivo substituído
+    try:
+        modo = caminho.stat().st_mode & 0o777
+    except FileNotFoundError:
+        modo = 0o644
+    try:
+        os.chmod(temporario, modo)
+    except OSError:
+        pass
+    return fd, temporario
+
+
+def _substituir(temporario: Path, caminho: Path) -> None:
+    """Renomeia o temporário sobre o destino e grava a entrada no disco."""
+    os.replace(temporario, caminho)
+    _sincronizar_diretorio(caminho.parent)
+
+
+def _sincronizar_diretorio(diretorio: Path) -> None:
+    """Grava no disco a entrada do rename (só em sistemas POSIX)."""
+    if os.name != "posix":
+        return
+    fd = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,231 @@
+"""
+SPGraph - Módulo de Acessibilidade com Capacidade (2SFCA / E2SFCA)
+===================================================================
+Mede a oferta de serviços de saúde disponível para cada distrito levando
+em conta a capacidade dos serviços (leitos) e a população que disputa
+essa capacidade, e não apenas a distância ao serviço mais próximo.
+
+Métodos disponíveis:
+- 2SFCA: área de captação de raio fixo, todos os pares com peso 1
+- E2SFCA: mesma área dividida em faixas com pesos decrescentes
+
+Passos (com W = peso da faixa de distância):
+1. Para cada distrito com serviço j: R_j = oferta_j / Σ_k W(d_kj) · pop_k
+2. Para cada distrito i: A_i = Σ_j W(d_ij) · R_j
+
+Os pares (serviço, distrito) dentro do raio vêm de um Dijkstra limitado
+por lote de origens; as duas etapas são agregações vetorizadas.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from src.grafo import GrafoSP
+
+
+METODOS = ("2sfca", "e2sfca")
+
+# Raio de captação padrão (km)
+RAIO_PADRAO_KM = 10.0
+
+# Faixas do E2SFCA como (fração do raio, peso), com os pesos gaussianos
+# usuais na literatura para três sub-zonas
+FAIXAS_E2SFCA = ((1 / 3, 1.0), (2 / 3, 0.68), (1.0, 0.22))
+
+# Número de distritos de origem por Dijkstra limitado
+TAMANHO_LOTE = 256
+
+
+class AcessibilidadeCapacidade:
+    """
+    Calcula o índice de acessibilidade por capacidade de cada distrito.
+
+    A oferta de um serviço é o número de leitos quando o tipo registra
+    leitos (serviços sem o dado recebem a mediana do tipo) ou uma unidade
+    por estabelecimento caso contrário. O índice é expresso por mil
+    habitantes.
+    """
+
+    def __init__(self, grafo: GrafoSP):
+        """
+        Inicializa com uma instância do grafo.
+
+        Args:
+            grafo: Instância de GrafoSP já construída.
+        """
+        self.grafo = grafo
+
+        # Resultados por (tipo, método, raio), válidos enquanto
+        # grafo.versao for igual a _versao_cache
+        self._cache: dict[tuple, dict] = {}
+        self._versao_cache = grafo.versao
+
+    def limpar_cache(self):
+        """Descarta os resultados memorizados."""
+        self._cache.clear()
+        self._versao_cache = self.grafo.versao
+
+    def oferta(self, tipo_servico: str) -> tuple[np.ndarray, str]:
+        """
+        Oferta total do tipo de serviço em cada distrito.
+
+        Args:
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
+
+        Returns:
+            Tupla (array de oferta na ordem de `grafo.ids_por_indice`,
+            unidade: 'leitos' ou 'unidades').
+        """
+        tabela = self.grafo.tabela_servicos
+        n = len(self.grafo.ids_por_indice)
+        codigo = tabela.codigo_tipo.get(tipo_servico)
+        if codigo is None:
+            return np.zeros(n), "unidades"
+
+        linhas = np.flatnonzero((tabela.tipo == codigo) & (tabela.distrito >= 0))
+        leitos = tabela.leitos[linhas].astype(float)
+        if (leitos > 0).any():
+            leitos[leitos <= 0] = np.median(leitos[leitos > 0])
+            unidade = "leitos"
+        else:
+            leitos = np.ones(len(linhas))
+            unidade = "unidades"
+        return np.bincount(tabela.distrito[linhas], weights=leitos, minlength=n), unidade
+
+    @staticmethod
+    def pesos_distancia(distancias: np.ndarray, raio_km: float, metodo: str) -> np.ndarray:
+        """
+        Peso de cada par conforme a distância (pares já dentro do raio).
+
+        Args:
+            distancias: Distâncias em km.
+            raio_km: Raio de captação.
+            metodo: '2sfca' ou 'e2sfca'.
+
+        Returns:
+            Array de pesos no intervalo (0, 1].
+        """
+        if metodo == "2sfca":
+            return np.ones(len(distancias))
+        limites = np.array([f for f, _ in FAIXAS_E2SFCA]) * raio_km
+        pesos = np.array([w for _, w in FAIXAS_E2SFCA])
+        faixa = np.searchsorted(limites, distancias, side="left")
+        return pesos[np.minimum(faixa, len(pesos) - 1)]
+
+    def _pares_captacao(
+        self, fontes: np.ndarray, raio_km: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pares (distrito com serviço, distrito, distância) dentro do raio."""
+        partes = []
+        for inicio in range(0, len(fontes), TAMANHO_LOTE):
+            lote = fontes[inicio:inicio + TAMANHO_LOTE]
+            pos, vert, dist = self.grafo.distancias_limitadas(lote, raio_km)
+            partes.append((lote[pos], vert, dist))
+        if not partes:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio, np.empty(0)
+        return tuple(np.concatenate(c) for c in zip(*partes))
+
+    def calcular(
+        self,
+        tipo_servico: str,
+        metodo: str = "2sfca",
+        raio_km: float = RAIO_PADRAO_KM,
+    ) -> dict:
+        """
+        Calcula o índice de acessibilidade por capacidade de todos os distritos.
+
+        O resultado fica memorizado até a próxima alteração do grafo.
+
+        Args:
+            tipo_servico: Tipo de serviço.
+            metodo: '2sfca' ou 'e2sfca'.
+            raio_km: Raio de captação em km.
+
+        Returns:
+            Dicionário com 'indice' (oferta por mil habitantes, na ordem de
+            `grafo.ids_por_indice`), 'razoes' (R_j por distrito, 0 onde não
+            há serviço), 'unidade', 'ranking' (DataFrame) e 'media'.
+
+        Raises:
+            ValueError: Se o método for desconhecido.
+        """
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconhecido: {metodo!r}")
+        if self._versao_cache != self.grafo.versao:
+            self.limpar_cache()
+        chave = (tipo_servico, metodo, float(raio_km))
+        if chave in self._cache:
+            return self._cache[chave]
+
+        ids = self.grafo.ids_por_indice
+        n = len(ids)
+        infos = [self.grafo.distritos[did] for did in ids.tolist()]
+        populacao = np.array([d["populacao"] for d in infos], dtype=float)
+
+        oferta, unidade = self.oferta(tipo_servico)
+        fontes = np.flatnonzero(oferta > 0)
+        servico, distrito, dist = self._pares_captacao(fontes, raio_km)
+        pesos = self.pesos_distancia(dist, raio_km, metodo)
+
+        # Etapa 1: razão oferta/demanda ponderada de cada distrito com serviço
+        demanda = np.bincount(servico, weights=pesos * populacao[distrito], minlength=n)
+        razoes = np.zeros(n)
+        com_demanda = demanda > 0
+        razoes[com_demanda] = oferta[com_demanda] / demanda[com_demanda]
+
+        # Etapa 2: soma das razões alcançáveis por distrito
+        indice = np.bincount(distrito, weights=pesos * razoes[servico], minlength=n) * 1000.0
+
+        maximo = float(indice.max()) if n else 0.0
+        scores = np.round(indice / maximo * 100, 1) if maximo > 0 else np.zeros(n)
+
+        df = pd.DataFrame({
+            "distrito_id": ids,
+            "distrito": [d["nome"] for d in infos],
+            "zona": [d["zona"] for d in infos],
+            "populacao": populacao.astype(np.int64),
+            "indice": np.round(indice, 4),
+            "score": scores,
+        })
+        df = df.sort_values("indice", ascending=False, kind="stable")
+        df.insert(0, "posicao", np.arange(1, len(df) + 1))
+        ranking = df.reset_index(drop=True)
+
+        total_pop = populacao.sum()
+        media = {
+            "indice_medio": round(float(indice.mean()), 4) if n else 0,
+            "indice_ponderado": (
+                round(float(indice @ populacao / total_pop), 4) if total_pop > 0 else 0
+            ),
+            "sem_acesso": int((indice == 0).sum()),
+            "melhor_indice": round(maximo, 4),
+            "pior_indice": round(float(indice.min()), 4) if n else 0,
+        }
+
+        resultado = {
+            "indice": indice,
+            "razoes": razoes,
+            "unidade": unidade,
+            "ranking": ranking,
+            "media": media,
+        }
+        self._cache[chave] = resultado
+        return resultado
+
+    def ranking(
+        self,
+        tipo_servico: str,
+        metodo: str = "2sfca",
+        raio_km: float = RAIO_PADRAO_KM,
+    ) -> pd.DataFrame:
+        """
+        Ranking dos distritos pelo índice de capacidade (maior primeiro).
+
+        Returns:
+            DataFrame com colunas: posicao, distrito_id, distrito, zona,
+            populacao, indice (por mil habitantes) e score (0 a 100,
+            relativo ao melhor distrito).
+        """
+        return self.calcular(tipo_servico, metodo, raio_km)["ranking"].copy()
@@ -0,0 +1,585 @@
+"""
+SPGraph - Módulo de Geometria dos Distritos
+============================================
+Pré-processamento dos polígonos distritais do KML da cidade para o mapa.
+
+O KML é lido uma única vez e convertido em um artefato compacto, gravado
+em cache no disco e reaproveitado entre sessões:
+- Buffer único de coordenadas (lon, lat) com offsets por anel
+- Offsets de anéis por polígono (distrito do KML)
+- Áreas assinadas dos anéis, anel principal, centroide e ponto de rótulo
+- Caixas delimitadoras (bounding boxes) por polígono
+- ID do distrito do grafo associado a cada polígono
+
+Cada anel também é guardado em versões simplificadas (Douglas–Peucker) com
+tolerâncias crescentes; o mapa escolhe o nível pela extensão visível.
+
+Os cálculos (área e centroide pela fórmula do laço, ponto no polígono por
+ray casting) são vetorizados com NumPy, inclusive a classificação de muitos
+pontos contra muitos polígonos com pré-filtro por caixa delimitadora.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import unicodedata
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+from src.arquivos import escrita_atomica
+
+
+# Versão do layout do arquivo de cache da geometria
+VERSAO_CACHE_GEOMETRIA = 2
+
+# Tolerâncias (graus) dos níveis de simplificação; o nível 0 é o original
+TOLERANCIAS_SIMPLIFICACAO = (0.0, 0.0001, 0.0005, 0.002)
+
+# Largura típica do mapa em pixels: o nível escolhido é o de maior
+# tolerância que ainda cabe em um pixel da extensão visível
+PIXELS_MAPA = 800
+
+NS_KML = {"kml": "http://www.opengis.net/kml/2.2"}
+
+
+def normalizar_nome(valor: str) -> str:
+    """Nome em maiúsculas e sem acentos, para casar KML e distritos (ex.: "Sé" -> "SE")."""
+    texto = str(valor).strip().upper()
+    texto = "".join(
+        c for c in unicodedata.normalize("NFKD", texto)
+        if not unicodedata.combining(c)
+    )
+    return texto
+
+
+def area_anel(anel) -> float:
+    """Área assinada aproximada de anel fechado (lon/lat), pela fórmula do laço."""
+    xy = np.asarray(anel, dtype=float)
+    if len(xy) < 3:
+        return 0.0
+    x, y = xy[:, 0], xy[:, 1]
+    return float((x[:-1] * y[1:] - x[1:] * y[:-1]).sum()) / 2.0
+
+
+def centroide_anel(anel) -> tuple[float, float]:
+    """Centroide do anel pela fórmula do polígono (cai no meio se a área é nula)."""
+    xy = np.asarray(anel, dtype=float)
+    if len(xy) < 3:
+        return (0.0, 0.0)
+
+    x1, y1 = xy[:-1, 0], xy[:-1, 1]
+    x2, y2 = xy[1:, 0], xy[1:, 1]
+    cross = x1 * y2 - x2 * y1
+    a = cross.sum() / 2.0
+    if abs(a) < 1e-12:
+        return tuple(xy[len(xy) // 2].tolist())
+
+    return (
+        float(((x1 + x2) * cross).sum() / (6.0 * a)),
+        float(((y1 + y2) * cross).sum() / (6.0 * a)),
+    )
+
+
+def pontos_em_anel(xs, ys, anel, bloco: int = 4096) -> np.ndarray:
+    """
+    Ray casting de vários pontos contra todas as arestas do anel de uma vez.
+
+    Args:
+        xs, ys: Coordenadas dos pontos.
+        anel: Vértices (k, 2) do anel.
+        bloco: Pontos por bloco (limita a matriz pontos × arestas).
+
+    Returns:
+        Array booleano: True para os pontos dentro do anel.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    xy = np.asarray(anel, dtype=float)
+    dentro = np.zeros(len(xs), dtype=bool)
+    if len(xy) < 3:
+        return dentro
+
+    # Aresta i liga o vértice i ao anterior (j = i - 1, circular)
+    xi, yi = xy[:, 0], xy[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    dy = yj - yi
+    dy = np.where(dy != 0, dy, 1e-12)
+
+    for inicio in range(0, len(xs), bloco):
+        px = xs[inicio:inicio + bloco, None]
+        py = ys[inicio:inicio + bloco, None]
+        cruza = (yi > py) != (yj > py)
+        x_inter = (xj - xi) * (py - yi) / dy + xi
+        dentro[inicio:inicio + bloco] = ((cruza & (px < x_inter)).sum(axis=1) % 2) == 1
+    return dentro
+
+
+def ponto_em_poligono(x: float, y: float, poligono) -> bool:
+    """Teste simples de ponto no polígono (ray casting)."""
+    return bool(pontos_em_anel([x], [y], poligono)[0])
+
+
+def ponto_representativo_anel(anel) -> tuple[float, float]:
+    """Retorna ponto representativo preferencialmente dentro do anel."""
+    xy = np.asarray(anel, dtype=float)
+    if len(xy) < 3:
+        return (0.0, 0.0)
+
+    cx, cy = centroide_anel(xy)
+    if ponto_em_poligono(cx, cy, xy):
+        return (cx, cy)
+
+    # fallback robusto: ponto de um vértice (sempre no contorno do distrito)
+    return tuple(xy[len(xy) // 2].tolist())
+
+
+def areas_e_centroides(coords: np.ndarray, inicio_anel: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Área assinada e centroide de todos os anéis de um buffer de uma só vez.
+
+    Os produtos vetoriais são calculados sobre o buffer inteiro deslocado
+    de uma posição; os pares que cruzam a fronteira entre dois anéis são
+    zerados e as somas por anel saem de `np.add.reduceat`.
+
+    Args:
+        coords: Buffer (N, 2) com os anéis fechados, em sequência.
+        inicio_anel: Offsets dos anéis (R + 1 posições).
+
+    Returns:
+        Tupla (areas (R,), centroides (R, 2)). Anéis de área nula têm como
+        centroide o vértice do meio.
+    """
+    n_aneis = len(inicio_anel) - 1
+    if n_aneis == 0:
+        return np.empty(0), np.empty((0, 2))
+
+    x1, y1 = coords[:-1, 0], coords[:-1, 1]
+    x2, y2 = coords[1:, 0], coords[1:, 1]
+    cross = x1 * y2 - x2 * y1
+    # O par (último vértice do anel r, primeiro do anel r + 1) não é aresta
+    cross[inicio_anel[1:-1] - 1] = 0.0
+
+    inicios = inicio_anel[:-1]
+    somas = np.add.reduceat(
+        np.column_stack([cross, (x1 + x2) * cross, (y1 + y2) * cross]),
+        inicios,
+        axis=0,
+    )
+    areas = somas[:, 0] / 2.0
+    centroides = coords[(inicios + inicio_anel[1:]) // 2].copy()
+    validos = np.abs(areas) >= 1e-12
+    centroides[validos] = somas[validos, 1:3] / (6.0 * areas[validos, None])
+    return areas, centroides
+
+
+def simplificar_anel(anel: np.ndarray, tolerancia: float) -> np.ndarray:
+    """
+    Simplificação de Douglas–Peucker (iterativa) de um anel fechado.
+
+    O primeiro e o último vértice (iguais) são sempre mantidos; em cada
+    trecho, as distâncias de todos os vértices internos ao segmento são
+    calculadas de uma vez. Se o anel degenerar, fica com 4 vértices.
+
+    Args:
+        anel: Vértices (k, 2) do anel.
+        tolerancia: Distância máxima (graus) entre o original e o simplificado.
+
+    Returns:
+        Vértices (m, 2) mantidos, na ordem original.
+    """
+    n = len(anel)
+    if tolerancia <= 0 or n <= 4:
+        return anel
+
+    manter = np.zeros(n, dtype=bool)
+    manter[0] = manter[-1] = True
+    pilha = [(0, n - 1)]
+    while pilha:
+        i, j = pilha.pop()
+        if j <= i + 1:
+            continue
+        a, b = anel[i], anel[j]
+        internos = anel[i + 1:j] - a
+        dx, dy = b - a
+        comprimento = np.hypot(dx, dy)
+        if comprimento == 0:
+            # Segmento degenerado (início e fim do anel): distância ao ponto
+            dist = np.hypot(internos[:, 0], internos[:, 1])
+        else:
+            dist = np.abs(dx * internos[:, 1] - dy * internos[:, 0]) / comprimento
+        k = int(np.argmax(dist))
+        if dist[k] > tolerancia:
+            m = i + 1 + k
+            manter[m] = True
+            pilha.append((i, m))
+            pilha.append((m, j))
+
+    if manter.sum() < 4:
+        manter[[n // 3, 2 * n // 3]] = True
+    return anel[manter]
+
+
+def _ler_aneis_kml(caminho_kml: Path) -> list[tuple[str, list[list[tuple[float, float]]]]]:
+    """Lê o KML e retorna (nome normalizado, anéis externos) por Placemark."""
+    root = ET.parse(caminho_kml).getroot()
+    poligonos: dict[str, list[list[tuple[float, float]]]] = {}
+
+    for placemark in root.findall(".//kml:Placemark", NS_KML):
+        nome = placemark.findtext("kml:name", default="", namespaces=NS_KML)
+        nome_norm = normalizar_nome(nome)
+
+        aneis: list[list[tuple[float, float]]] = []
+        for coord_node in placemark.findall(
+            ".//kml:outerBoundaryIs/kml:LinearRing/kml:coordinates", NS_KML
+        ):
+            txt = (coord_node.text or "").strip()
+            if not txt:
+                continue
+
+            pontos: list[tuple[float, float]] = []
+            for token in txt.replace("\n", " ").split():
+                partes = token.split(",")
+                if len(partes) < 2:
+                    continue
+                try:
+                    lon = float(partes[0])
+                    lat = float(partes[1])
+                    pontos.append((lon, lat))
+                except ValueError:
+                    continue
+
+            if len(pontos) < 3:
+                continue
+
+            if pontos[0] != pontos[-1]:
+                pontos.append(pontos[0])
+
+            aneis.append(pontos)
+
+        if aneis:
+            poligonos[nome_norm] = aneis
+
+    return list(poligonos.items())
+
+
+class GeometriaDistritos:
+    """
+    Polígonos distritais em buffers NumPy.
+
+    O anel r ocupa `coords[inicio_anel[r]:inicio_anel[r + 1]]` e o
+    polígono p é formado pelos anéis `inicio_poligono[p]` até
+    `inicio_poligono[p + 1] - 1`. As demais colunas são indexadas pelo
+    anel (`areas`) ou pelo polígono (as outras).
+    """
+
+    # Arrays gravados no cache, na ordem do construtor
+    CAMPOS = (
+        "coords", "inicio_anel", "inicio_poligono", "areas",
+        "anel_principal", "centroides", "pontos_label", "limites", "limites_poligono",
+    )
+
+    def __init__(
+        self,
+        nomes: list[str],
+        coords: np.ndarray,
+        inicio_anel: np.ndarray,
+        inicio_poligono: np.ndarray,
+        areas: np.ndarray,
+        anel_principal: np.ndarray,
+        centroides: np.ndarray,
+        pontos_label: np.ndarray,
+        limites: np.ndarray,
+        limites_poligono: np.ndarray,
+        niveis: list[tuple[np.ndarray, np.ndarray]] | None = None,
+        tolerancias: tuple[float, ...] = (0.0,),
+    ):
+        self.nomes = nomes
+        self.coords = coords
+        self.inicio_anel = inicio_anel
+        self.inicio_poligono = inicio_poligono
+        self.areas = areas
+        self.anel_principal = anel_principal
+        self.centroides = centroides
+        self.pontos_label = pontos_label
+        # (xmin, xmax, ymin, ymax) do anel principal e de todos os anéis
+        self.limites = limites
+        self.limites_poligono = limites_poligono
+        # (coords, inicio_anel) por nível de simplificação; nível 0 = original
+        self.niveis = [(coords, inicio_anel)] + list(niveis or [])
+        self.tolerancias = tuple(tolerancias)
+        # ID do distrito no grafo (-1 se o nome não foi encontrado)
+        self.distrito_ids = np.full(len(nomes), -1, dtype=np.int64)
+
+    @property
+    def num_poligonos(self) -> int:
+        return len(self.nomes)
+
+    def anel(self, r: int, nivel: int = 0) -> np.ndarray:
+        """Coordenadas (k, 2) do anel r no nível dado (visão, sem cópia)."""
+        coords, inicio_anel = self.niveis[nivel]
+        return coords[inicio_anel[r]:inicio_anel[r + 1]]
+
+    def nivel_para_extensao(self, largura: float, altura: float) -> int:
+        """
+        Nível de simplificação adequado à extensão visível do mapa (graus).
+
+        Escolhe a maior tolerância que não passa de um pixel, supondo o
+        mapa com PIXELS_MAPA pixels no maior lado.
+        """
+        alvo = max(largura, altura) / PIXELS_MAPA
+        return max(k for k, tol in enumerate(self.tolerancias) if tol <= alvo or k == 0)
+
+    def aneis(self, p: int) -> range:
+        """Índices dos anéis do polígono p."""
+        return range(int(self.inicio_poligono[p]), int(self.inicio_poligono[p + 1]))
+
+    def associar_distritos(self, ids_por_nome: dict[str, int]):
+        """Preenche `distrito_ids` a partir de {nome normalizado: distrito_id}."""
+        self.distrito_ids = np.array(
+            [ids_por_nome.get(nome, -1) for nome in self.nomes], dtype=np.int64
+        )
+
+    @classmethod
+    def de_kml(cls, caminho_kml: str | Path) -> "GeometriaDistritos":
+        """Lê o KML e calcula áreas, centroides, rótulos e limites."""
+        placemarks = _ler_aneis_kml(Path(caminho_kml))
+
+        nomes = [nome for nome, _ in placemarks]
+        blocos = [anel for _, aneis in placemarks for anel in aneis]
+        if not blocos:
+            return cls.vazia()
+
+        inicio_poligono = np.zeros(len(placemarks) + 1, dtype=np.int64)
+        np.cumsum([len(aneis) for _, aneis in placemarks], out=inicio_poligono[1:])
+        inicio_anel = np.zeros(len(blocos) + 1, dtype=np.int64)
+        np.cumsum([len(anel) for anel in blocos], out=inicio_anel[1:])
+        coords = np.concatenate([np.asarray(anel, dtype=np.float64) for anel in blocos])
+
+        areas, centroides_aneis = areas_e_centroides(coords, inicio_anel)
+
+        # Limites por anel e, a partir deles, por polígono
+        mins = np.minimum.reduceat(coords, inicio_anel[:-1], axis=0)
+        maxs = np.maximum.reduceat(coords, inicio_anel[:-1], axis=0)
+        limites_aneis = np.column_stack([mins[:, 0], maxs[:, 0], mins[:, 1], maxs[:, 1]])
+        primeiro = inicio_poligono[:-1]
+        limites_poligono = np.column_stack([
+            np.minimum.reduceat(limites_aneis[:, 0], primeiro),
+            np.maximum.reduceat(limites_aneis[:, 1], primeiro),
+            np.minimum.reduceat(limites_aneis[:, 2], primeiro),
+            np.maximum.reduceat(limites_aneis[:, 3], primeiro),
+        ])
+
+        # Anel principal: o de maior área absoluta (o primeiro, em caso de empate)
+        principal = np.array([
+            a + int(np.argmax(np.abs(areas[a:b])))
+            for a, b in zip(primeiro.tolist(), inicio_poligono[1:].tolist())
+        ], dtype=np.int64)
+        centroides = centroides_aneis[principal]
+
+        # Rótulo: centroide se cair dentro do anel principal, senão o vértice do meio
+        pontos_label = centroides.copy()
+        for p, r in enumerate(principal.tolist()):
+            anel = coords[inicio_anel[r]:inicio_anel[r + 1]]
+            if not pontos_em_anel(centroides[p, :1], centroides[p, 1:], anel)[0]:
+                pontos_label[p] = anel[len(anel) // 2]
+
+        # Versões simplificadas de cada anel, por tolerância
+        niveis = []
+        for tolerancia in TOLERANCIAS_SIMPLIFICACAO[1:]:
+            simplificados = [
+                simplificar_anel(coords[a:b], tolerancia)
+                for a, b in zip(inicio_anel[:-1].tolist(), inicio_anel[1:].tolist())
+            ]
+            inicio_nivel = np.zeros(len(simplificados) + 1, dtype=np.int64)
+            np.cumsum([len(anel) for anel in simplificados], out=inicio_nivel[1:])
+            niveis.append((np.concatenate(simplificados), inicio_nivel))
+
+        return cls(
+            nomes=nomes,
+            coords=coords,
+            inicio_anel=inicio_anel,
+            inicio_poligono=inicio_poligono,
+            areas=areas,
+            anel_principal=principal,
+            centroides=centroides,
+            pontos_label=pontos_label,
+            limites=limites_aneis[principal],
+            limites_poligono=limites_poligono,
+            niveis=niveis,
+            tolerancias=TOLERANCIAS_SIMPLIFICACAO,
+        )
+
+    def buffer_separado(self, poligonos, nivel: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Anéis de vários polígonos em um único buffer separado por NaN.
+
+        É o formato que o Plotly usa para desenhar várias formas em um só
+        trace (cada trecho entre NaN vira uma forma fechada com fill="toself").
+
+        Args:
+            poligonos: Índices dos polígonos.
+            nivel: Nível de simplificação (0 = original).
+
+        Returns:
+            Tupla (coords (M, 2) com uma linha NaN após cada anel, índice
+            do polígono de cada linha (-1 nos separadores)).
+        """
+        coords, inicio_anel = self.niveis[nivel]
+        poligonos = np.asarray(poligonos, dtype=np.int64)
+        n_aneis = self.inicio_poligono[poligonos + 1] - self.inicio_poligono[poligonos]
+        if n_aneis.sum() == 0:
+            return np.empty((0, 2)), np.empty(0, dtype=np.int64)
+
+        # Anéis selecionados e o polígono de cada um
+        rampa = np.arange(n_aneis.sum()) - np.repeat(np.cumsum(n_aneis) - n_aneis, n_aneis)
+        aneis = np.repeat(self.inicio_poligono[poligonos], n_aneis) + rampa
+        dono_anel = np.repeat(poligonos, n_aneis)
+
+        # Cada anel ocupa seu tamanho + 1 (separador) no buffer de saída
+        inicios = inicio_anel[aneis]
+        tamanhos = inicio_anel[aneis + 1] - inicios
+        destino = np.cumsum(tamanhos + 1) - (tamanhos + 1)
+        rampa = np.arange(tamanhos.sum()) - np.repeat(np.cumsum(tamanhos) - tamanhos, tamanhos)
+
+        total = int((tamanhos + 1).sum())
+        saida = np.full((total, 2), np.nan)
+        dono = np.full(total, -1, dtype=np.int64)
+        posicoes = np.repeat(destino, tamanhos) + rampa
+        saida[posicoes] = coords[np.repeat(inicios, tamanhos) + rampa]
+        dono[posicoes] = np.repeat(dono_anel, tamanhos)
+        return saida, dono
+
+    def localizar(self, xs, ys) -> np.ndarray:
+        """
+        Polígono que contém cada ponto (classificação em lote).
+
+        Para cada polígono, só os pontos ainda não classificados que caem
+        na sua caixa delimitadora são testados, contra todas as arestas de
+        cada anel de uma vez (`pontos_em_anel`).
+
+        Args:
+            xs, ys: Longitudes e latitudes dos pontos.
+
+        Returns:
+            Array com o índice do polígono de cada ponto (-1 se nenhum).
+        """
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        resultado = np.full(len(xs), -1, dtype=np.int64)
+
+        for p in range(self.num_poligonos):
+            xmin, xmax, ymin, ymax = self.limites_poligono[p]
+            candidatos = np.flatnonzero(
+                (resultado < 0)
+                & (xs >= xmin) & (xs <= xmax)
+                & (ys >= ymin) & (ys <= ymax)
+            )
+            for r in self.aneis(p):
+                if candidatos.size == 0:
+                    break
+                dentro = pontos_em_anel(xs[candidatos], ys[candidatos], self.anel(r))
+                resultado[candidatos[dentro]] = p
+                candidatos = candidatos[~dentro]
+
+        return resultado
+
+    def localizar_distritos(self, xs, ys) -> np.ndarray:
+        """Como `localizar`, mas retorna o ID do distrito (-1 se nenhum)."""
+        poligonos = self.localizar(xs, ys)
+        return np.where(poligonos >= 0, self.distrito_ids[poligonos], -1)
+
+    @classmethod
+    def vazia(cls) -> "GeometriaDistritos":
+        """Geometria sem polígonos (KML ausente)."""
+        return cls(
+            nomes=[],
+            coords=np.empty((0, 2)),
+            inicio_anel=np.zeros(1, dtype=np.int64),
+            inicio_poligono=np.zeros(1, dtype=np.int64),
+            areas=np.empty(0),
+            anel_principal=np.empty(0, dtype=np.int64),
+            centroides=np.empty((0, 2)),
+            pontos_label=np.empty((0, 2)),
+            limites=np.empty((0, 4)),
+            limites_poligono=np.empty((0, 4)),
+        )
+
+    def salvar(self, caminho: str | Path) -> Path:
+        """Grava o artefato em .npz (temporário + rename)."""
+        caminho = Path(caminho)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {campo: getattr(self, campo) for campo in self.CAMPOS}
+        arrays["nomes"] = np.array(self.nomes, dtype=str)
+        arrays["versao"] = np.array(VERSAO_CACHE_GEOMETRIA)
+        arrays["tolerancias"] = np.array(self.tolerancias, dtype=np.float64)
+        for k, (coords, inicio_anel) in enumerate(self.niveis[1:], start=1):
+            arrays[f"coords_{k}"] = coords
+            arrays[f"inicio_anel_{k}"] = inicio_anel
+
+        with escrita_atomica(caminho, "wb") as f:
+            np.savez(f, **arrays)
+        return caminho
+
+    @classmethod
+    def carregar(cls, caminho: str | Path) -> "GeometriaDistritos":
+        """
+        Lê um artefato gravado por `salvar`.
+
+        Raises:
+            ValueError: Se a versão do arquivo for incompatível.
+        """
+        with np.load(caminho, allow_pickle=False) as dados:
+            if int(dados["versao"]) != VERSAO_CACHE_GEOMETRIA:
+                raise ValueError(f"Cache de geometria versão {int(dados['versao'])} incompatível.")
+            tolerancias = tuple(dados["tolerancias"].tolist())
+            niveis = [
+                (dados[f"coords_{k}"], dados[f"inicio_anel_{k}"])
+                for k in range(1, len(tolerancias))
+            ]
+            return cls(
+                dados["nomes"].tolist(),
+                *(dados[campo] for campo in cls.CAMPOS),
+                niveis=niveis,
+                tolerancias=tolerancias,
+            )
+
+
+def carregar_geometria(
+    caminho_kml: str | Path, cache_dir: str | Path | None = None
+) -> GeometriaDistritos:
+    """
+    Geometria dos distritos a partir do KML, usando o cache em disco.
+
+    O cache é identificado pelo hash do conteúdo do KML; se não existir
+    (ou for de outra versão), o KML é lido e o artefato é gravado.
+
+    Args:
+        caminho_kml: Arquivo KML com um Placemark por distrito.
+        cache_dir: Diretório do cache (padrão: .cache ao lado do KML).
+
+    Returns:
+        GeometriaDistritos (vazia se o KML não existir).
+    """
+    caminho_kml = Path(caminho_kml)
+    if not caminho_kml.exists():
+        return GeometriaDistritos.vazia()
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else caminho_kml.parent / ".cache"
+    h = hashlib.sha256(f"v{VERSAO_CACHE_GEOMETRIA}".encode())
+    h.update(caminho_kml.read_bytes())
+    arquivo = cache_dir / f"geometria_{h.hexdigest()[:16]}.npz"
+
+    if arquivo.exists():
+        try:
+            return GeometriaDistritos.carregar(arquivo)
+        except (ValueError, OSError, KeyError):
+            pass
+
+    geometria = GeometriaDistritos.de_kml(caminho_kml)
+    try:
+        geometria.salvar(arquivo)
+    except OSError:
+        pass
+    return geometria
@@ -10,13 +10,202 @@ Implementa:
 - BFS (busca em largura)
 - Cálculo de centralidade
 - Busca da referência de serviço de saúde mais próxima
+- Dijkstra com múltiplas origens (super-origem) por tipo de serviço
+- Matriz de distâncias entre todos os pares com cache em disco
+- Representação CSR (arrays NumPy) usada pelas travessias
+- Contador de versão para invalidar resultados derivados após alterações
+- Inclusão/remoção de serviços com atualização incremental das distâncias
+- Intermediação exata (paralela) ou aproximada por amostragem de pivôs
+- Proximidade paralela com o CSR em memória compartilhada
+- A* com heurística geográfica (haversine) para rotas ponto a ponto
+- Snapshot binário (.npz) para inicialização rápida
+- Consultas de serviço via tabela colunar (TabelaServicos)
+- Modo preguiçoso: cada parte do modelo é carregada no primeiro acesso
 """
 
+import hashlib
+import heapq
 import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
 from pathlib import Path
+from typing import Iterator
 from collections import deque
 
 import networkx as nx
+import numpy as np
+
+from src.arquivos import escrita_atomica
+from src.servicos import TabelaServicos
+
+
+# Versão do layout dos arquivos de cache da matriz de distâncias
+VERSAO_CACHE_MATRIZ = 1
+
+# Versão do formato do snapshot binário do grafo
+VERSAO_SNAPSHOT = 3
+
+# Estado de cada valor numa coluna do snapshot: presente, None ou chave
+# ausente no registro (só gravado quando a coluna não é toda "presente")
+_PRESENTE, _NULO, _AUSENTE = 0, 1, 2
+_FALTA = object()
+
+# Partes do modelo e os atributos que cada uma define. No modo preguiçoso
+# uma parte só é carregada quando um de seus atributos é acessado.
+PARTES_GRAFO = {
+    "vertices": ("distritos", "ids_por_indice", "indice_por_id"),
+    "adjacencias": ("adjacencias",),
+    "servicos": ("servicos", "servicos_por_distrito", "servicos_por_tipo"),
+    "csr": (
+        "csr_indptr", "csr_indices", "csr_pesos", "_csr_lacos",
+        "_lat_rad", "_lon_rad", "_fator_heuristica",
+    ),
+    "nx": ("G",),
+}
+_PARTE_DO_ATRIBUTO = {
+    atributo: parte for parte, atributos in PARTES_GRAFO.items() for atributo in atributos
+}
+
+# Regra do projeto: apenas UBS, UPA e Hospital SUS
+TIPOS_PERMITIDOS = {"ubs", "upa", "hospital_sus"}
+
+# Raio médio da Terra (km), usado na heurística do A*
+RAIO_TERRA_KM = 6371.0088
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Distância de grande círculo em km (aceita escalares ou arrays, em radianos)."""
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+# Arrays CSR anexados à memória compartilhada em cada processo filho
+_CSR_TRABALHADOR: tuple | None = None
+
+
+def _anexar_csr(spec: list[tuple[str, tuple[int, ...], str]]):
+    """Inicializador dos processos filhos: mapeia o CSR compartilhado sem cópia."""
+    global _CSR_TRABALHADOR
+    blocos = [shared_memory.SharedMemory(name=nome) for nome, _, _ in spec]
+    arrays = tuple(
+        np.ndarray(forma, dtype=np.dtype(tipo), buffer=bloco.buf)
+        for bloco, (_, forma, tipo) in zip(blocos, spec)
+    )
+    # Mantém os blocos referenciados enquanto o processo existir
+    _CSR_TRABALHADOR = arrays + (blocos,)
+
+
+def _brandes_bloco(fontes: list[int]) -> np.ndarray:
+    """Brandes para um bloco de origens usando o CSR compartilhado."""
+    return _brandes_parcial(*_CSR_TRABALHADOR[:3], fontes)
+
+
+def _proximidade_bloco(fontes: list[int]) -> list[tuple[int, float]]:
+    """Proximidade para um bloco de origens usando o CSR compartilhado."""
+    return _proximidade_parcial(*_CSR_TRABALHADOR[:3], fontes)
+
+
+def _proximidade_parcial(
+    indptr: np.ndarray, indices: np.ndarray, pesos: np.ndarray, fontes: list[int]
+) -> list[tuple[int, float]]:
+    """
+    Centralidade de proximidade das origens informadas.
+
+    Usa a mesma fórmula do NetworkX (wf_improved=True): (r-1)/soma ajustado
+    por (r-1)/(n-1), onde r é o nº de vértices alcançáveis.
+    """
+    n = len(indptr) - 1
+    inf = float("inf")
+    resultado = []
+
+    for s in fontes:
+        dist = [inf] * n
+        dist[s] = 0.0
+        heap = [(0.0, s)]
+        alcancados = 0
+        soma = 0.0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            alcancados += 1
+            soma += d
+            a, b = indptr[u], indptr[u + 1]
+            for v, peso in zip(indices[a:b].tolist(), pesos[a:b].tolist()):
+                nd = d + peso
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+
+        if soma > 0 and n > 1:
+            resultado.append((s, (alcancados - 1) / soma * (alcancados - 1) / (n - 1)))
+        else:
+            resultado.append((s, 0.0))
+
+    return resultado
+
+
+def _brandes_parcial(
+    indptr: np.ndarray, indices: np.ndarray, pesos: np.ndarray, fontes: list[int]
+) -> np.ndarray:
+    """
+    Soma das dependências de Brandes para um subconjunto de origens.
+
+    Função de módulo (e não método) para poder ser enviada a processos
+    filhos. Segue a mesma contagem de caminhos do NetworkX, de modo que a
+    soma sobre todas as origens reproduz `nx.betweenness_centrality`.
+    """
+    n = len(indptr) - 1
+    total = np.zeros(n, dtype=np.float64)
+    inf = float("inf")
+
+    for s in fontes:
+        ordem: list[int] = []
+        preds: list[list[int]] = [[] for _ in range(n)]
+        sigma = [0.0] * n
+        visto = [inf] * n
+        fixado = bytearray(n)
+        sigma[s] = 1.0
+        visto[s] = 0.0
+        heap = [(0.0, s, s)]
+
+        while heap:
+            dist, pred, v = heapq.heappop(heap)
+            if fixado[v]:
+                continue
+            if v != s:
+                sigma[v] += sigma[pred]
+            fixado[v] = 1
+            ordem.append(v)
+
+            a, b = indptr[v], indptr[v + 1]
+            for w, peso in zip(indices[a:b].tolist(), pesos[a:b].tolist()):
+                vw = dist + peso
+                if not fixado[w] and vw < visto[w]:
+                    visto[w] = vw
+                    heapq.heappush(heap, (vw, v, w))
+                    sigma[w] = 0.0
+                    preds[w] = [v]
+                elif vw == visto[w]:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+
+        delta = [0.0] * n
+        while ordem:
+            w = ordem.pop()
+            coef = (1.0 + delta[w]) / sigma[w]
+            for v in preds[w]:
+                delta[v] += sigma[v] * coef
+            if w != s:
+                total[w] += delta[w]
+
+    return total
 
 
 class GrafoSP:
@@ -27,81 +216,170 @@ class GrafoSP:
     (base distrital) como arestas ponderadas pela distância em km.
     """
 
-    def __init__(self, data_dir: str | Path = "data"):
+    def __init__(self, data_dir: str | Path = "data", lazy: bool = False):
         """
         Inicializa o grafo carregando dados do diretório especificado.
 
         Args:
             data_dir: Caminho para o diretório com os arquivos JSON.
+            lazy: Se True, vértices, arestas, serviços e o grafo NetworkX
+                só são carregados/construídos no primeiro acesso.
         """
+        self._inicializar_atributos(data_dir)
+        self._carregadores = {
+            "vertices": self._carregar_vertices,
+            "adjacencias": self._carregar_adjacencias,
+            "servicos": self._carregar_servicos,
+            "csr": self._carregar_csr,
+            "nx": self._construir_grafo,
+        }
+        if not lazy:
+            self.carregar_tudo()
+
+    def __getattr__(self, nome: str):
+        # Só é chamado quando o atributo ainda não existe: carrega a parte
+        # correspondente (modo preguiçoso) e repete a busca
+        carregadores = self.__dict__.get("_carregadores")
+        parte = _PARTE_DO_ATRIBUTO.get(nome)
+        if carregadores and parte in carregadores:
+            self._carregar_parte(parte)
+            return getattr(self, nome)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {nome!r}")
+
+    def _carregar_parte(self, parte: str):
+        """
+        Executa o carregador de uma parte e o descarta se ele terminar.
+
+        Durante a execução o carregador fica fora de _carregadores, para que
+        um acesso à própria parte não o chame de novo. Se falhar, ele volta
+        para _carregadores e os atributos que chegou a definir são apagados:
+        o próximo acesso tenta outra vez em vez de ver a parte pela metade.
+        """
+        carregador = self._carregadores.pop(parte)
+        try:
+            carregador()
+        except BaseException:
+            for atributo in PARTES_GRAFO[parte]:
+                self.__dict__.pop(atributo, None)
+            self._carregadores[parte] = carregador
+            raise
+
+    def carregar_tudo(self):
+        """Materializa todas as partes ainda não carregadas."""
+        for parte in PARTES_GRAFO:
+            if parte in self._carregadores:
+                self._carregar_parte(parte)
+
+    def _inicializar_atributos(self, data_dir: str | Path):
+        """Define os atributos comuns a JSON e snapshot (exceto as partes)."""
         self.data_dir = Path(data_dir)
-        self.G = nx.Graph()
-        self.distritos: dict[int, dict] = {}
-        self.servicos: list[dict] = []
-        self.servicos_por_distrito: dict[int, list[dict]] = {}
-        self.servicos_por_tipo: dict[str, list[dict]] = {}
 
-        self._carregar_dados()
-        self._construir_grafo()
+        # Partes (PARTES_GRAFO), definidas pelos carregadores:
+        # - distritos {id: dict}, ids_por_indice / indice_por_id (id <-> índice)
+        # - adjacencias (lista de dicts do arquivo)
+        # - servicos, servicos_por_distrito, servicos_por_tipo
+        # - CSR: vizinhos de i em csr_indices[csr_indptr[i]:csr_indptr[i + 1]]
+        # - G (NetworkX)
+        self._carregadores: dict = {}
+        self._cabecalho_snapshot: dict | None = None
+
+        # Matriz de distâncias entre todos os pares (opcional)
+        self.matriz_distancias: np.ndarray | None = None
+        self.matriz_predecessores: np.ndarray | None = None
+
+        # Incrementado a cada alteração de vértices, arestas ou serviços
+        # (validade dos caches de resultados)
+        self.versao: int = 0
+
+        # Incrementado só quando vértices/arestas mudam; enquanto for 0 as
+        # distâncias ainda são as dos arquivos de origem (cache da matriz)
+        self.versao_topologia: int = 0
+
+        # Estado do Dijkstra multi-origem por tipo de serviço:
+        # listas (dist, origem, pred) indexadas pelo índice do vértice
+        self._mais_proximos: dict[str, tuple[list[float], list[int], list[int]]] = {}
+
+        # Centralidades já calculadas (chave: nome + parâmetros)
+        self._centralidades: dict[tuple, dict[int, float]] = {}
+
+        # Tabela colunar dos serviços (reconstruída após alterações)
+        self._tabela_servicos: TabelaServicos | None = None
+
+        self._arquivo_vertices = self.data_dir / "ubs_vertices.json"
+        if not self._arquivo_vertices.exists():
+            self._arquivo_vertices = self.data_dir / "distritos.json"
+        self._chave_matriz: str | None = None
 
     # ================================================================
     # Carregamento e Construção
     # ================================================================
 
-    def _carregar_dados(self):
-        """Carrega os dados dos arquivos JSON."""
-        vertices_path = self.data_dir / "ubs_vertices.json"
-        if not vertices_path.exists():
-            vertices_path = self.data_dir / "distritos.json"
-
-        with open(vertices_path, "r", encoding="utf-8") as f:
+    def _carregar_vertices(self):
+        """Carrega os vértices (distritos/UBSs) do arquivo JSON."""
+        with open(self._arquivo_vertices, "r", encoding="utf-8") as f:
             lista_distritos = json.load(f)
         self.distritos = {d["id"]: d for d in lista_distritos}
+        self.ids_por_indice = np.fromiter(self.distritos, dtype=np.int64)
+        self.indice_por_id = {did: i for i, did in enumerate(self.distritos)}
 
-        # Adjacências
+    def _carregar_adjacencias(self):
+        """Carrega as adjacências do arquivo JSON."""
         with open(self.data_dir / "adjacencias.json", "r", encoding="utf-8") as f:
             self.adjacencias = json.load(f)
 
-        # Serviços
+    def _carregar_servicos(self):
+        """Carrega, normaliza e indexa os serviços do arquivo JSON."""
         with open(self.data_dir / "servicos.json", "r", encoding="utf-8") as f:
             servicos_brutos = json.load(f)
 
         # Normalização e filtro de tipos permitidos
-        # Regra do projeto: apenas UBS, UPA e Hospital SUS
-        tipos_permitidos = {"ubs", "upa", "hospital_sus"}
         self.servicos = []
+        self.servicos_por_distrito = {}
+        self.servicos_por_tipo = {}
         for s in servicos_brutos:
-            tipo = str(s.get("tipo", "")).strip().lower()
+            s_norm = self._normalizar_servico(s)
+            if s_norm is not None:
+                self._indexar_servico(s_norm)
 
-            # Compatibilidade com datasets legados
-            if tipo == "hospital":
-                tipo = "hospital_sus"
+    def _carregar_csr(self):
+        """Monta o CSR e a heurística do A* a partir de vértices e adjacências."""
+        self._construir_csr()
+        self._preparar_heuristica()
 
-            if tipo not in tipos_permitidos:
-                continue
+    @staticmethod
+    def _normalizar_servico(servico: dict) -> dict | None:
+        """Normaliza o tipo do serviço; retorna None se o tipo não é permitido."""
+        tipo = str(servico.get("tipo", "")).strip().lower()
 
-            s_norm = dict(s)
-            s_norm["tipo"] = tipo
-            self.servicos.append(s_norm)
+        # Compatibilidade com datasets legados
+        if tipo == "hospital":
+            tipo = "hospital_sus"
 
-        # Indexar serviços por distrito
-        self.servicos_por_distrito = {}
-        for s in self.servicos:
-            did = s["distrito_id"]
-            if did not in self.servicos_por_distrito:
-                self.servicos_por_distrito[did] = []
-            self.servicos_por_distrito[did].append(s)
+        if tipo not in TIPOS_PERMITIDOS:
+            return None
 
-        # Indexar serviços por tipo
-        self.servicos_por_tipo = {}
-        for s in self.servicos:
-            tipo = s["tipo"]
-            if tipo not in self.servicos_por_tipo:
-                self.servicos_por_tipo[tipo] = []
-            self.servicos_por_tipo[tipo].append(s)
+        s_norm = dict(servico)
+        s_norm["tipo"] = tipo
+        return s_norm
+
+    def _indexar_servico(self, servico: dict):
+        """Inclui o serviço na lista geral e nos índices por distrito e por tipo."""
+        self.servicos.append(servico)
+        self.servicos_por_distrito.setdefault(servico["distrito_id"], []).append(servico)
+        self.servicos_por_tipo.setdefault(servico["tipo"], []).append(servico)
+        self._tabela_servicos = None
+
+    @property
+    def tabela_servicos(self) -> TabelaServicos:
+        """Tabela colunar dos serviços, alinhada com `self.servicos`."""
+        if self._tabela_servicos is None:
+            self._tabela_servicos = TabelaServicos(self.servicos, self.indice_por_id)
+        return self._tabela_servicos
 
     def _construir_grafo(self):
         """Constrói o grafo NetworkX a partir dos dados carregados."""
+        self.G = nx.Graph()
+
         # Adicionar vértices (UBSs)
         for did, d in self.distritos.items():
             self.G.add_node(
@@ -121,6 +399,587 @@ class GrafoSP:
                 weight=adj["distancia_km"]
             )
 
+    def _construir_csr(self):
+        """Monta os arrays CSR (indptr/indices/pesos) a partir das adjacências."""
+        n = len(self.ids_por_indice)
+        m = len(self.adjacencias)
+        origem = np.empty(m, dtype=np.int64)
+        destino = np.empty(m, dtype=np.int64)
+        pesos = np.empty(m, dtype=np.float64)
+        for k, adj in enumerate(self.adjacencias):
+            origem[k] = self.indice_por_id[adj["distrito1_id"]]
+            destino[k] = self.indice_por_id[adj["distrito2_id"]]
+            pesos[k] = adj["distancia_km"]
+
+        # Grafo não direcionado: cada aresta aparece nos dois sentidos,
+        # intercalados para preservar a ordem das adjacências no arquivo
+        src = np.column_stack([origem, destino]).ravel()
+        dst = np.column_stack([destino, origem]).ravel()
+        w = np.repeat(pesos, 2)
+
+        # Arestas repetidas: prevalece a última ocorrência (como no NetworkX)
+        chave = src * n + dst
+        _, ultimos = np.unique(chave[::-1], return_index=True)
+        manter = np.sort(len(chave) - 1 - ultimos)
+        src, dst, w = src[manter], dst[manter], w[manter]
+
+        ordem = np.lexsort((dst, src))
+        self.csr_indices = dst[ordem].astype(np.int32)
+        self.csr_pesos = w[ordem]
+        self.csr_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.csr_indptr[1:])
+        self._csr_lacos = np.bincount(src[src == dst], minlength=n)
+
+    def _preparar_heuristica(self):
+        """Coordenadas em radianos e fator de escala da heurística do A*."""
+        n = len(self.ids_por_indice)
+
+        # Heurística do A*: fator * haversine, com fator = menor razão
+        # peso/haversine entre as arestas (limitado a 1). Assim h(u) nunca
+        # excede w(u, v) + h(v) e a heurística é admissível e consistente.
+        self._lat_rad = np.radians([self.distritos[did]["lat"] for did in self.ids_por_indice.tolist()])
+        self._lon_rad = np.radians([self.distritos[did]["lon"] for did in self.ids_por_indice.tolist()])
+        origem_arestas = np.repeat(np.arange(n), np.diff(self.csr_indptr))
+        geo = _haversine_km(
+            self._lat_rad[origem_arestas], self._lon_rad[origem_arestas],
+            self._lat_rad[self.csr_indices], self._lon_rad[self.csr_indices],
+        )
+        com_geo = geo > 1e-9
+        razoes = self.csr_pesos[com_geo] / geo[com_geo]
+        self._fator_heuristica = float(min(1.0, razoes.min())) if razoes.size else 0.0
+
+    def _vizinhos_csr(self, i: int) -> tuple[list[int], list[float]]:
+        """Retorna (índices, pesos) dos vizinhos do vértice de índice i."""
+        a, b = self.csr_indptr[i], self.csr_indptr[i + 1]
+        return self.csr_indices[a:b].tolist(), self.csr_pesos[a:b].tolist()
+
+    def _dijkstra_csr(
+        self, fontes: list[int], alvo: int | None = None
+    ) -> tuple[list[float], list[int], list[int], list[int]]:
+        """
+        Dijkstra sobre os arrays CSR a partir de um ou mais índices de origem.
+
+        Args:
+            fontes: Índices dos vértices de origem (distância 0).
+            alvo: Índice em que a busca pode parar ao ser fixado.
+
+        Returns:
+            Tupla (dist, origem, pred, ordem): listas indexadas pelo índice do
+            vértice (inf / -1 quando não alcançado) e a ordem de fixação.
+        """
+        n = len(self.ids_por_indice)
+        dist = [float("inf")] * n
+        origem = [-1] * n
+        pred = [-1] * n
+        ordem: list[int] = []
+
+        for u in self._fixacoes_csr(fontes, dist, origem, pred):
+            ordem.append(u)
+            if u == alvo:
+                break
+
+        return dist, origem, pred, ordem
+
+    def _fixacoes_csr(
+        self, fontes: list[int], dist: list[float], origem: list[int], pred: list[int]
+    ) -> Iterator[int]:
+        """
+        Gerador do Dijkstra sobre o CSR: produz cada vértice ao ser fixado.
+
+        Os vértices saem em ordem não decrescente de distância; `dist`,
+        `origem` e `pred` (listas de tamanho n, inf / -1) são preenchidas
+        no lugar à medida que a busca avança.
+        """
+        fixado = bytearray(len(dist))
+        heap: list[tuple[float, int]] = []
+        for f in fontes:
+            if dist[f] != 0.0:
+                dist[f] = 0.0
+                origem[f] = f
+                heap.append((0.0, f))
+        heapq.heapify(heap)
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if fixado[u]:
+                continue
+            fixado[u] = 1
+            yield u
+
+            vizinhos, pesos = self._vizinhos_csr(u)
+            for v, w in zip(vizinhos, pesos):
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    origem[v] = origem[u]
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+
+    # ================================================================
+    # Snapshot Binário
+    # ================================================================
+
+    @staticmethod
+    def _colunas(registros: list[dict], prefixo: str) -> tuple[dict[str, np.ndarray], dict]:
+        """
+        Converte uma lista de dicionários em colunas NumPy.
+
+        As colunas são a união das chaves de todos os registros. Uma coluna
+        com um único tipo escalar vira um array nativo; as demais (tipos
+        mistos, listas, dicts, inteiros enormes) são gravadas como texto
+        JSON. Se algum registro não tem a chave ou tem None, uma coluna
+        `<nome>__estado` guarda o estado de cada registro e o array de
+        valores só contém os presentes.
+
+        Returns:
+            Tupla (arrays por nome, descrição para o meta do snapshot).
+        """
+        chaves = list(dict.fromkeys(chave for r in registros for chave in r))
+        arrays: dict[str, np.ndarray] = {}
+        colunas = []
+        for chave in chaves:
+            nome = f"{prefixo}{chave}"
+            valores = [r.get(chave, _FALTA) for r in registros]
+            estado = np.array(
+                [_AUSENTE if v is _FALTA else _NULO if v is None else _PRESENTE for v in valores],
+                dtype=np.int8,
+            )
+            com_estado = bool((estado != _PRESENTE).any())
+            if com_estado:
+                valores = [v for v, e in zip(valores, estado.tolist()) if e == _PRESENTE]
+                arrays[f"{nome}__estado"] = estado
+
+            coluna = None
+            tipos = {type(v) for v in valores}
+            if len(tipos) == 1 and tipos <= {int, float, str, bool}:
+                coluna = np.array(valores)
+                if coluna.dtype == object:
+                    coluna = None
+            em_json = coluna is None
+            if em_json:
+                coluna = np.array([json.dumps(v) for v in valores], dtype=str)
+            arrays[nome] = coluna
+            colunas.append({"chave": chave, "json": em_json, "estado": com_estado})
+        return arrays, {"n": len(registros), "colunas": colunas}
+
+    @staticmethod
+    def _nomes_colunas(prefixo: str, descricao: dict) -> tuple[str, ...]:
+        """Arrays do snapshot que `_registros` precisa ler."""
+        nomes = []
+        for col in descricao["colunas"]:
+            nomes.append(f"{prefixo}{col['chave']}")
+            if col["estado"]:
+                nomes.append(f"{prefixo}{col['chave']}__estado")
+        return tuple(nomes)
+
+    @staticmethod
+    def _registros(dados, prefixo: str, descricao: dict) -> list[dict]:
+        """Operação inversa de `_colunas`."""
+        chaves = [col["chave"] for col in descricao["colunas"]]
+        if not chaves:
+            return [{} for _ in range(descricao["n"])]
+
+        colunas = []
+        algum_ausente = False
+        for col in descricao["colunas"]:
+            nome = f"{prefixo}{col['chave']}"
+            valores = dados[nome].tolist()
+            if col["json"]:
+                valores = [json.loads(v) for v in valores]
+            if col["estado"]:
+                estado = dados[f"{nome}__estado"].tolist()
+                algum_ausente = algum_ausente or _AUSENTE in estado
+                presentes = iter(valores)
+                valores = [
+                    next(presentes) if e == _PRESENTE else (None if e == _NULO else _FALTA)
+                    for e in estado
+                ]
+            colunas.append(valores)
+
+        if not algum_ausente:
+            return [dict(zip(chaves, linha)) for linha in zip(*colunas)]
+        return [
+            {k: v for k, v in zip(chaves, linha) if v is not _FALTA}
+            for linha in zip(*colunas)
+        ]
+
+    def salvar_snapshot(self, caminho: str | Path | None = None) -> Path:
+        """
+        Grava o grafo em um único arquivo binário versionado (.npz).
+
+        O arquivo guarda os atributos dos vértices e serviços em colunas,
+        as adjacências, os arrays CSR e os dados da heurística do A*, de
+        modo que `carregar_snapshot` não precisa reconstruir nada.
+
+        Args:
+            caminho: Arquivo de saída (padrão: <data_dir>/grafo.npz).
+
+        Returns:
+            Caminho do arquivo gravado.
+        """
+        caminho = Path(caminho) if caminho is not None else self.data_dir / "grafo.npz"
+        distritos = list(self.distritos.values())
+
+        try:
+            chave_matriz = self._chave_cache_matriz() if self.versao_topologia == 0 else ""
+        except OSError:
+            chave_matriz = ""
+
+        colunas_distritos, desc_distritos = self._colunas(distritos, "v_")
+        colunas_servicos, desc_servicos = self._colunas(self.servicos, "s_")
+        meta = {
+            "versao": VERSAO_SNAPSHOT,
+            "data_dir": str(self.data_dir),
+            "chave_matriz": chave_matriz,
+            "colunas_distritos": desc_distritos,
+            "colunas_servicos": desc_servicos,
+            "cabecalho": self.cabecalho(),
+        }
+
+        arrays = {
+            "meta": np.array(json.dumps(meta)),
+            "adj_origem": np.array([a["distrito1_id"] for a in self.adjacencias], dtype=np.int64),
+            "adj_destino": np.array([a["distrito2_id"] for a in self.adjacencias], dtype=np.int64),
+            "adj_peso": np.array([a["distancia_km"] for a in self.adjacencias], dtype=np.float64),
+            "ids_por_indice": self.ids_por_indice,
+            "csr_indptr": self.csr_indptr,
+            "csr_indices": self.csr_indices,
+            "csr_pesos": self.csr_pesos,
+            "csr_lacos": self._csr_lacos,
+            "lat_rad": self._lat_rad,
+            "lon_rad": self._lon_rad,
+            "fator_heuristica": np.array(self._fator_heuristica),
+        }
+        arrays.update(colunas_distritos)
+        arrays.update(colunas_servicos)
+
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        with escrita_atomica(caminho, "wb") as f:
+            np.savez(f, **arrays)
+        return caminho
+
+    @classmethod
+    def carregar_snapshot(cls, caminho: str | Path, lazy: bool = False) -> "GrafoSP":
+        """
+        Cria um GrafoSP a partir de um arquivo gravado por `salvar_snapshot`.
+
+        Args:
+            caminho: Arquivo .npz do snapshot.
+            lazy: Se True, lê apenas o cabeçalho agora; cada parte do modelo
+                é lida do arquivo no primeiro acesso. Com False, os arrays
+                (CSR, heurística, ids) são usados como estão, sem trabalho
+                por registro; os dicionários `distritos` e `servicos` (com
+                seus índices) e o grafo NetworkX são montados na hora,
+                porque são a interface usada pelo app e pelas métricas.
+                A lista `adjacencias` (só usada em edições e ao regravar
+                o snapshot) fica sempre sob demanda.
+
+        Com 10^5 vértices, 3000 serviços e 3·10^5 arestas, a carga completa
+        leva ~1,9 s, dos quais ~1,65 s são o NetworkX, ~0,2 s os dicionários
+        de distritos e ~0,01 s os serviços; o mesmo grafo a partir dos
+        JSON leva ~3,9 s.
+
+        Returns:
+            Instância de GrafoSP equivalente à que foi salva.
+
+        Raises:
+            ValueError: Se a versão do snapshot for incompatível ou se o
+                arquivo estiver truncado, corrompido ou não for um snapshot.
+        """
+        caminho = Path(caminho)
+
+        def ler(chaves: tuple[str, ...]) -> dict[str, np.ndarray]:
+            # np.load só descompacta os arrays pedidos. Um arquivo truncado,
+            # corrompido ou alheio falha de muitas formas (zipfile, zlib,
+            # cabeçalho .npy, chave ausente): todas viram ValueError
+            try:
+                with np.load(caminho, allow_pickle=False) as dados:
+                    return {chave: dados[chave] for chave in chaves}
+            except Exception as e:
+                raise ValueError(f"Snapshot inválido ({caminho}): {e}") from e
+
+        meta = json.loads(str(ler(("meta",))["meta"]))
+        if not isinstance(meta, dict):
+            raise ValueError(f"Snapshot inválido ({caminho}): cabeçalho ausente.")
+        if meta.get("versao") != VERSAO_SNAPSHOT:
+            raise ValueError(
+                f"Snapshot versão {meta.get('versao')} incompatível "
+                f"(esperada {VERSAO_SNAPSHOT})."
+            )
+
+        grafo = cls.__new__(cls)
+        grafo._inicializar_atributos(meta["data_dir"])
+        grafo._chave_matriz = meta["chave_matriz"] or None
+        if grafo._chave_matriz is None:
+            # Snapshot gravado com a topologia alterada (ou sem os arquivos
+            # de origem): o cache da matriz em disco não vale para ele
+            grafo.versao_topologia = 1
+        grafo._cabecalho_snapshot = meta["cabecalho"]
+
+        def vertices():
+            colunas = cls._nomes_colunas("v_", meta["colunas_distritos"])
+            dados = ler(("ids_por_indice",) + colunas)
+            grafo.ids_por_indice = dados["ids_por_indice"]
+            ids = grafo.ids_por_indice.tolist()
+            grafo.indice_por_id = {did: i for i, did in enumerate(ids)}
+            grafo.distritos = dict(zip(ids, cls._registros(dados, "v_", meta["colunas_distritos"])))
+
+        def adjacencias():
+            dados = ler(("adj_origem", "adj_destino", "adj_peso"))
+            grafo.adjacencias = [
+                {"distrito1_id": u, "distrito2_id": v, "distancia_km": w}
+                for u, v, w in zip(
+                    dados["adj_origem"].tolist(),
+                    dados["adj_destino"].tolist(),
+                    dados["adj_peso"].tolist(),
+                )
+            ]
+
+        def servicos():
+            dados = ler(cls._nomes_colunas("s_", meta["colunas_servicos"]))
+            grafo.servicos = []
+            grafo.servicos_por_distrito = {}
+            grafo.servicos_por_tipo = {}
+            for servico in cls._registros(dados, "s_", meta["colunas_servicos"]):
+                grafo._indexar_servico(servico)
+
+        def csr():
+            dados = ler((
+                "csr_indptr", "csr_indices", "csr_pesos", "csr_lacos",
+                "lat_rad", "lon_rad", "fator_heuristica",
+            ))
+            grafo.csr_indptr = dados["csr_indptr"]
+            grafo.csr_indices = dados["csr_indices"]
+            grafo.csr_pesos = dados["csr_pesos"]
+            grafo._csr_lacos = dados["csr_lacos"]
+            grafo._lat_rad = dados["lat_rad"]
+            grafo._lon_rad = dados["lon_rad"]
+            grafo._fator_heuristica = float(dados["fator_heuristica"])
+
+        grafo._carregadores = {
+            "vertices": vertices,
+            "adjacencias": adjacencias,
+            "servicos": servicos,
+            "csr": csr,
+            "nx": grafo._construir_grafo_csr,
+        }
+        if not lazy:
+            for parte in list(grafo._carregadores):
+                if parte != "adjacencias":
+                    grafo._carregar_parte(parte)
+        return grafo
+
+    def _construir_grafo_csr(self):
+        """Constrói o grafo NetworkX em lote a partir dos arrays CSR."""
+        self.G = nx.Graph()
+        atributos = ("nome", "zona", "lat", "lon", "populacao")
+        self.G.add_nodes_from(
+            (did, {k: d[k] for k in atributos}) for did, d in self.distritos.items()
+        )
+        origem = np.repeat(np.arange(len(self.ids_por_indice)), np.diff(self.csr_indptr))
+        uma_vez = origem <= self.csr_indices
+        self.G.add_weighted_edges_from(zip(
+            self.ids_por_indice[origem[uma_vez]].tolist(),
+            self.ids_por_indice[self.csr_indices[uma_vez]].tolist(),
+            self.csr_pesos[uma_vez].tolist(),
+        ))
+
+    def _do_snapshot(self, parte: str) -> dict | None:
+        """
+        Cabeçalho do snapshot, se a parte ainda não foi carregada.
+
+        Uma parte não carregada também não foi alterada (toda alteração
+        passa pelos seus atributos), então os números gravados valem.
+        """
+        if (
+            self._cabecalho_snapshot is not None
+            and parte in self._carregadores
+            and PARTES_GRAFO[parte][0] not in self.__dict__
+        ):
+            return self._cabecalho_snapshot
+        return None
+
+    def _resumo_servicos(self) -> dict:
+        """num_servicos e tipos_servico, lendo só a parte de serviços."""
+        snapshot = self._do_snapshot("servicos")
+        if snapshot is not None:
+            return {
+                "num_servicos": snapshot["num_servicos"],
+                "tipos_servico": list(snapshot["tipos_servico"]),
+            }
+        return {
+            "num_servicos": len(self.servicos),
+            "tipos_servico": sorted(self.servicos_por_tipo),
+        }
+
+    def cabecalho(self) -> dict:
+        """
+        Metadados baratos do modelo, sem construir o grafo NetworkX.
+
+        Cada número vem da sua própria parte (vértices, CSR, serviços) ou,
+        enquanto a parte não foi carregada, do cabeçalho do snapshot.
+
+        Returns:
+            Dicionário com num_vertices, num_arestas, num_servicos e
+            tipos_servico (lista ordenada).
+        """
+        snapshot = self._do_snapshot("vertices")
+        num_vertices = (
+            snapshot["num_vertices"] if snapshot is not None else len(self.ids_por_indice)
+        )
+        snapshot = self._do_snapshot("csr")
+        num_arestas = snapshot["num_arestas"] if snapshot is not None else self._num_arestas_csr()
+        return {
+            "num_vertices": num_vertices,
+            "num_arestas": num_arestas,
+            **self._resumo_servicos(),
+        }
+
+    # ================================================================
+    # Alterações no Grafo
+    # ================================================================
+
+    def marcar_alteracao(self):
+        """
+        Registra uma alteração no modelo.
+
+        Incrementa `versao` (usado por caches externos, como o de
+        MetricasAcessibilidade) e `versao_topologia` (matriz de distâncias
+        em disco) e descarta estruturas derivadas que deixaram de ser
+        válidas.
+        """
+        self.versao += 1
+        self.versao_topologia += 1
+        self.matriz_distancias = None
+        self.matriz_predecessores = None
+        self._mais_proximos.clear()
+        self._centralidades.clear()
+
+    def adicionar_aresta(self, distrito1_id: int, distrito2_id: int, distancia_km: float) -> bool:
+        """
+        Adiciona (ou atualiza o peso de) uma adjacência entre dois distritos.
+
+        Returns:
+            False se algum dos distritos não existir.
+        """
+        if distrito1_id not in self.distritos or distrito2_id not in self.distritos:
+            return False
+
+        self.adjacencias.append({
+            "distrito1_id": distrito1_id,
+            "distrito2_id": distrito2_id,
+            "distancia_km": distancia_km,
+        })
+        self.G.add_edge(distrito1_id, distrito2_id, weight=distancia_km)
+        self._construir_csr()
+        self._preparar_heuristica()
+        self.marcar_alteracao()
+        return True
+
+    def remover_aresta(self, distrito1_id: int, distrito2_id: int) -> bool:
+        """
+        Remove a adjacência entre dois distritos.
+
+        Returns:
+            False se a aresta não existir.
+        """
+        if not self.G.has_edge(distrito1_id, distrito2_id):
+            return False
+
+        par = {distrito1_id, distrito2_id}
+        self.adjacencias = [
+            adj for adj in self.adjacencias
+            if {adj["distrito1_id"], adj["distrito2_id"]} != par
+        ]
+        self.G.remove_edge(distrito1_id, distrito2_id)
+        self._construir_csr()
+        self._preparar_heuristica()
+        self.marcar_alteracao()
+        return True
+
+    # ================================================================
+    # Matriz de Distâncias (todos os pares)
+    # ================================================================
+
+    def _chave_cache_matriz(self) -> str:
+        """Hash dos arquivos de vértices e adjacências que definem a matriz."""
+        if self._chave_matriz is None:
+            h = hashlib.sha256(f"v{VERSAO_CACHE_MATRIZ}".encode())
+            for caminho in (self._arquivo_vertices, self.data_dir / "adjacencias.json"):
+                h.update(Path(caminho).read_bytes())
+            self._chave_matriz = h.hexdigest()[:16]
+        return self._chave_matriz
+
+    def precomputar_matriz(self, cache_dir: str | Path | None = None) -> None:
+        """
+        Ativa o modo matricial: consultas passam a ler a matriz de distâncias.
+
+        A matriz vem de ler_matriz() (cache em disco via memory-map, ou
+        calculada sem cache se o grafo já foi alterado em memória).
+
+        Args:
+            cache_dir: Diretório do cache (padrão: <data_dir>/.cache).
+        """
+        self.matriz_distancias, self.matriz_predecessores = self.ler_matriz(cache_dir)
+
+    def ler_matriz(self, cache_dir: str | Path | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Carrega (ou calcula e grava) a matriz de distâncias entre todos os pares.
+
+        As distâncias ficam em float32 e os predecessores em int32 (-1 quando
+        não há predecessor). Os arquivos são abertos via memory-map, então uma
+        inicialização com cache existente não recalcula nenhum caminho.
+        Se o grafo já foi alterado em memória, a matriz é calculada sem cache.
+
+        Não altera o grafo: quem só precisa da matriz (o otimizador, por
+        exemplo) recebe um handle próprio e as consultas do grafo continuam
+        no modo em que estavam.
+
+        Args:
+            cache_dir: Diretório do cache (padrão: <data_dir>/.cache).
+
+        Returns:
+            Tupla (distancias, predecessores) indexada por índice de vértice.
+        """
+        if self.versao_topologia > 0:
+            # Grafo alterado em memória: os arquivos não o descrevem mais
+            return self._calcular_matriz()
+
+        cache_dir = Path(cache_dir) if cache_dir is not None else self.data_dir / ".cache"
+        chave = self._chave_cache_matriz()
+        arq_dist = cache_dir / f"matriz_{chave}_dist.npy"
+        arq_pred = cache_dir / f"matriz_{chave}_pred.npy"
+
+        if not (arq_dist.exists() and arq_pred.exists()):
+            dist, pred = self._calcular_matriz()
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            for arquivo, matriz in ((arq_dist, dist), (arq_pred, pred)):
+                with escrita_atomica(arquivo, "wb") as f:
+                    np.save(f, matriz)
+
+        return np.load(arq_dist, mmap_mode="r"), np.load(arq_pred, mmap_mode="r")
+
+    def _calcular_matriz(self) -> tuple[np.ndarray, np.ndarray]:
+        """Executa Dijkstra a partir de cada vértice e preenche as matrizes."""
+        n = len(self.ids_por_indice)
+        dist = np.full((n, n), np.inf, dtype=np.float32)
+        pred = np.full((n, n), -1, dtype=np.int32)
+
+        for i in range(n):
+            d, _, p, _ = self._dijkstra_csr([i])
+            dist[i] = d
+            pred[i] = p
+
+        return dist, pred
+
+    def _caminho_matriz(self, i: int, j: int) -> list[int]:
+        """Reconstrói o caminho i -> j percorrendo a linha de predecessores."""
+        linha = self.matriz_predecessores[i]
+        caminho = [j]
+        while caminho[-1] != i:
+            caminho.append(int(linha[caminho[-1]]))
+        return [int(self.ids_por_indice[k]) for k in reversed(caminho)]
+
     # ================================================================
     # Algoritmos de Grafos
     # ================================================================
@@ -129,6 +988,10 @@ class GrafoSP:
         """
         Calcula o menor caminho entre dois distritos usando Dijkstra.
 
+        Sem matriz de distâncias, a busca é um A* guiado pela distância
+        geográfica até o destino, que fixa bem menos vértices que o
+        Dijkstra puro e devolve distância e caminho numa só passagem.
+
         Args:
             origem_id: ID do distrito de origem.
             destino_id: ID do distrito de destino.
@@ -137,17 +1000,63 @@ class GrafoSP:
             Tupla (distância_total_km, lista_de_ids_no_caminho).
             Retorna (inf, []) se não houver caminho.
         """
-        try:
-            distancia = nx.dijkstra_path_length(
-                self.G, origem_id, destino_id, weight="weight"
-            )
-            caminho = nx.dijkstra_path(
-                self.G, origem_id, destino_id, weight="weight"
-            )
-            return round(distancia, 2), caminho
-        except nx.NetworkXNoPath:
+        if self.matriz_distancias is not None:
+            i = self.indice_por_id[origem_id]
+            j = self.indice_por_id[destino_id]
+            distancia = float(self.matriz_distancias[i, j])
+            if distancia == float("inf"):
+                return float("inf"), []
+            return round(distancia, 2), self._caminho_matriz(i, j)
+
+        i = self.indice_por_id[origem_id]
+        j = self.indice_por_id[destino_id]
+        dist, pred, _ = self._astar_csr(i, j)
+        if dist[j] == float("inf"):
             return float("inf"), []
 
+        caminho = [j]
+        while caminho[-1] != i:
+            caminho.append(pred[caminho[-1]])
+        return round(dist[j], 2), [int(self.ids_por_indice[k]) for k in reversed(caminho)]
+
+    def _astar_csr(self, i: int, j: int) -> tuple[list[float], list[int], int]:
+        """
+        A* de i até j sobre o CSR com heurística haversine.
+
+        Returns:
+            Tupla (dist, pred, n_fixados); dist[j] é inf se não houver caminho.
+        """
+        n = len(self.ids_por_indice)
+        h = (self._fator_heuristica * _haversine_km(
+            self._lat_rad, self._lon_rad, self._lat_rad[j], self._lon_rad[j]
+        )).tolist()
+        dist = [float("inf")] * n
+        pred = [-1] * n
+        fixado = bytearray(n)
+        n_fixados = 0
+
+        dist[i] = 0.0
+        heap = [(h[i], i)]
+        while heap:
+            _, u = heapq.heappop(heap)
+            if fixado[u]:
+                continue
+            fixado[u] = 1
+            n_fixados += 1
+            if u == j:
+                break
+
+            d = dist[u]
+            vizinhos, pesos = self._vizinhos_csr(u)
+            for v, w in zip(vizinhos, pesos):
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd + h[v], v))
+
+        return dist, pred, n_fixados
+
     def dijkstra_todos(self, origem_id: int) -> dict[int, float]:
         """
         Calcula a distância mínima de um distrito para todos os outros.
@@ -158,9 +1067,17 @@ class GrafoSP:
         Returns:
             Dicionário {distrito_id: distância_km}.
         """
-        return dict(nx.single_source_dijkstra_path_length(
-            self.G, origem_id, weight="weight"
-        ))
+        if self.matriz_distancias is not None:
+            linha = self.matriz_distancias[self.indice_por_id[origem_id]]
+            alcancaveis = np.flatnonzero(np.isfinite(linha))
+            return dict(zip(
+                self.ids_por_indice[alcancaveis].tolist(),
+                linha[alcancaveis].astype(float).tolist(),
+            ))
+
+        dist, _, _, ordem = self._dijkstra_csr([self.indice_por_id[origem_id]])
+        ids = self.ids_por_indice.tolist()
+        return {ids[k]: dist[k] for k in ordem}
 
     def bfs(self, origem_id: int, max_profundidade: int | None = None) -> dict[int, int]:
         """
@@ -173,22 +1090,212 @@ class GrafoSP:
         Returns:
             Dicionário {distrito_id: profundidade (nº de saltos)}.
         """
-        visitados = {origem_id: 0}
-        fila = deque([origem_id])
+        inicio = self.indice_por_id[origem_id]
+        profundidade = [-1] * len(self.ids_por_indice)
+        profundidade[inicio] = 0
+        ordem = [inicio]
+        fila = deque([inicio])
+        indptr, indices = self.csr_indptr, self.csr_indices
 
         while fila:
             atual = fila.popleft()
-            profundidade_atual = visitados[atual]
+            profundidade_atual = profundidade[atual]
 
             if max_profundidade is not None and profundidade_atual >= max_profundidade:
                 continue
 
-            for vizinho in self.G.neighbors(atual):
-                if vizinho not in visitados:
-                    visitados[vizinho] = profundidade_atual + 1
+            for vizinho in indices[indptr[atual]:indptr[atual + 1]].tolist():
+                if profundidade[vizinho] < 0:
+                    profundidade[vizinho] = profundidade_atual + 1
+                    ordem.append(vizinho)
                     fila.append(vizinho)
 
-        return visitados
+        ids = self.ids_por_indice.tolist()
+        return {ids[k]: profundidade[k] for k in ordem}
+
+    def dijkstra_multiplas_origens(
+        self, origens: set[int] | list[int]
+    ) -> tuple[dict[int, float], dict[int, int], dict[int, int | None]]:
+        """
+        Executa Dijkstra a partir de várias origens simultaneamente.
+
+        Equivale a ligar uma super-origem a todas as origens com peso 0:
+        numa única passagem obtém, para cada distrito alcançável, a
+        distância até a origem mais próxima.
+
+        Args:
+            origens: IDs dos distritos usados como origem (distância 0).
+
+        Returns:
+            Tupla (distancias, origem_mais_proxima, predecessor), todos
+            dicionários indexados pelo ID do distrito. O predecessor aponta
+            na direção da origem (None para as próprias origens).
+        """
+        fontes = [self.indice_por_id[o] for o in origens if o in self.indice_por_id]
+        dist, origem, pred, ordem = self._dijkstra_csr(fontes)
+
+        ids = self.ids_por_indice.tolist()
+        distancias = {ids[k]: dist[k] for k in ordem}
+        origem_de = {ids[k]: ids[origem[k]] for k in ordem}
+        predecessor = {ids[k]: (ids[pred[k]] if pred[k] >= 0 else None) for k in ordem}
+        return distancias, origem_de, predecessor
+
+    def distancias_limitadas(
+        self, fontes: list[int] | np.ndarray, raio_km: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Distâncias de cada origem de um lote a todos os vértices a até raio_km.
+
+        Um único heap atende o lote inteiro: cada entrada carrega a posição
+        da origem, e cada par (origem, vértice) é fixado uma única vez, o que
+        dá o mesmo resultado de um Dijkstra limitado por origem. Com a
+        matriz de distâncias disponível, os pares saem direto dela.
+
+        Args:
+            fontes: Índices (não IDs) dos vértices de origem.
+            raio_km: Distância máxima (inclusiva).
+
+        Returns:
+            Tupla (posicao_fonte, vertice, distancia) de arrays alinhados,
+            um elemento por par alcançado dentro do raio.
+        """
+        fontes = np.asarray(fontes, dtype=np.int64)
+        if self.matriz_distancias is not None:
+            bloco = np.asarray(self.matriz_distancias[fontes], dtype=float)
+            pos, vert = np.nonzero(bloco <= raio_km)
+            return pos, vert, bloco[pos, vert]
+
+        n = len(self.ids_por_indice)
+        indptr = self.csr_indptr.tolist()
+        indices = self.csr_indices.tolist()
+        pesos = self.csr_pesos.tolist()
+
+        melhor: dict[int, float] = {}
+        heap = [(0.0, p, f) for p, f in enumerate(fontes.tolist())]
+        heapq.heapify(heap)
+        pos_out: list[int] = []
+        vert_out: list[int] = []
+        dist_out: list[float] = []
+        fixados: set[int] = set()
+
+        while heap:
+            d, p, u = heapq.heappop(heap)
+            chave = p * n + u
+            if chave in fixados:
+                continue
+            fixados.add(chave)
+            pos_out.append(p)
+            vert_out.append(u)
+            dist_out.append(d)
+
+            base = p * n
+            for k in range(indptr[u], indptr[u + 1]):
+                nd = d + pesos[k]
+                if nd > raio_km:
+                    continue
+                chave_v = base + indices[k]
+                if nd < melhor.get(chave_v, float("inf")):
+                    melhor[chave_v] = nd
+                    heapq.heappush(heap, (nd, p, indices[k]))
+
+        return (
+            np.array(pos_out, dtype=np.int64),
+            np.array(vert_out, dtype=np.int64),
+            np.array(dist_out, dtype=float),
+        )
+
+    def servicos_mais_proximos(
+        self, tipo_servico: str
+    ) -> tuple[dict[int, float], dict[int, int], dict[int, int | None]]:
+        """
+        Calcula, em uma única passagem, o distrito com serviço mais próximo
+        de cada distrito do grafo.
+
+        Args:
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
+
+        Returns:
+            Mesma tupla de `dijkstra_multiplas_origens`, semeada com todos
+            os distritos que possuem o tipo de serviço.
+        """
+        dist, origem, pred = self._estado_mais_proximo(tipo_servico)
+
+        ids = self.ids_por_indice.tolist()
+        alcancados = [k for k, d in enumerate(dist) if d < float("inf")]
+        distancias = {ids[k]: dist[k] for k in alcancados}
+        origem_de = {ids[k]: ids[origem[k]] for k in alcancados}
+        predecessor = {ids[k]: (ids[pred[k]] if pred[k] >= 0 else None) for k in alcancados}
+        return distancias, origem_de, predecessor
+
+    def iterar_mais_proximos(self, tipo_servico: str) -> Iterator[tuple[int, float, int | None]]:
+        """
+        Versão em fluxo de `servicos_mais_proximos`.
+
+        Produz cada distrito assim que o Dijkstra multi-origem o fixa, em
+        ordem não decrescente de distância; os distritos sem serviço
+        alcançável vêm por último, com distância inf. Ao terminar, o estado
+        da busca fica memorizado como em `servicos_mais_proximos`.
+
+        Args:
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
+
+        Yields:
+            Tuplas (distrito_id, distancia_km, distrito_id_do_servico),
+            com None no último campo quando não há serviço alcançável.
+        """
+        ids = self.ids_por_indice.tolist()
+        n = len(ids)
+        dist = [float("inf")] * n
+        origem = [-1] * n
+        pred = [-1] * n
+        fixado = bytearray(n)
+
+        fontes = self.tabela_servicos.distritos_com(tipo_servico).tolist()
+        for u in self._fixacoes_csr(fontes, dist, origem, pred):
+            fixado[u] = 1
+            yield ids[u], dist[u], ids[origem[u]]
+        for u in range(n):
+            if not fixado[u]:
+                yield ids[u], float("inf"), None
+
+        self._mais_proximos.setdefault(tipo_servico, (dist, origem, pred))
+
+    def _estado_mais_proximo(
+        self, tipo_servico: str
+    ) -> tuple[list[float], list[int], list[int]]:
+        """
+        Retorna (dist, origem, pred) do Dijkstra multi-origem de um tipo.
+
+        O estado é calculado uma vez e depois mantido incrementalmente por
+        `adicionar_servico` / `remover_servico`.
+        """
+        if tipo_servico not in self._mais_proximos:
+            fontes = self.tabela_servicos.distritos_com(tipo_servico).tolist()
+            dist, origem, pred, _ = self._dijkstra_csr(fontes)
+            self._mais_proximos[tipo_servico] = (dist, origem, pred)
+        return self._mais_proximos[tipo_servico]
+
+    def _relaxar_csr(
+        self,
+        dist: list[float],
+        origem: list[int],
+        pred: list[int],
+        heap: list[tuple[float, int]],
+    ):
+        """Propaga melhorias de distância a partir do heap, alterando o estado no lugar."""
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            vizinhos, pesos = self._vizinhos_csr(u)
+            for v, w in zip(vizinhos, pesos):
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    origem[v] = origem[u]
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
 
     def servico_mais_proximo(
         self, distrito_id: int, tipo_servico: str
@@ -198,52 +1305,163 @@ class GrafoSP:
 
         Args:
             distrito_id: ID do distrito de origem.
-            tipo_servico: Tipo de serviço ('hospital' ou 'ubs').
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
 
         Returns:
             Tupla (servico, distância_km, caminho).
             Retorna (None, inf, []) se não houver serviço acessível.
         """
+        tabela = self.tabela_servicos
+
         # Verificar se o próprio distrito tem o serviço
-        servicos_locais = [
-            s for s in self.servicos_por_distrito.get(distrito_id, [])
-            if s["tipo"] == tipo_servico
+        linha = tabela.linha_em(tipo_servico, self.indice_por_id[distrito_id])
+        if linha >= 0:
+            return self.servicos[linha], 0.0, [distrito_id]
+
+        if self.matriz_distancias is not None:
+            melhor_distrito, distancia, caminho = self._mais_proximo_matriz(
+                distrito_id, tipo_servico
+            )
+            if melhor_distrito is None:
+                return None, float("inf"), []
+        else:
+            dist, _, pred = self._estado_mais_proximo(tipo_servico)
+            i = self.indice_por_id[distrito_id]
+            if dist[i] == float("inf"):
+                return None, float("inf"), []
+            distancia = dist[i]
+            indices = [i]
+            while pred[indices[-1]] >= 0:
+                indices.append(pred[indices[-1]])
+            caminho = self.ids_por_indice[indices].tolist()
+            melhor_distrito = caminho[-1]
+
+        # Obter o serviço
+        servico = self.servicos[
+            tabela.linha_em(tipo_servico, self.indice_por_id[melhor_distrito])
         ]
-        if servicos_locais:
-            return servicos_locais[0], 0.0, [distrito_id]
 
-        # Obter todos os distritos que têm esse tipo de serviço
-        distritos_com_servico = set()
-        for s in self.servicos_por_tipo.get(tipo_servico, []):
-            distritos_com_servico.add(s["distrito_id"])
+        return servico, round(distancia, 2), caminho
+
+    def _mais_proximo_matriz(
+        self, distrito_id: int, tipo_servico: str
+    ) -> tuple[int | None, float, list[int]]:
+        """Busca o distrito com serviço mais próximo usando a matriz de distâncias."""
+        destinos = self.tabela_servicos.distritos_com(tipo_servico)
+        if destinos.size == 0:
+            return None, float("inf"), []
 
-        if not distritos_com_servico:
+        i = self.indice_por_id[distrito_id]
+        linha = self.matriz_distancias[i, destinos]
+        k = int(np.argmin(linha))
+        if not np.isfinite(linha[k]):
             return None, float("inf"), []
 
-        # Calcular distâncias mínimas para todos os distritos
-        distancias = self.dijkstra_todos(distrito_id)
+        j = int(destinos[k])
+        return int(self.ids_por_indice[j]), float(linha[k]), self._caminho_matriz(i, j)
 
-        # Encontrar o distrito com serviço mais próximo
-        menor_dist = float("inf")
-        melhor_distrito = None
-        for did in distritos_com_servico:
-            if did in distancias and distancias[did] < menor_dist:
-                menor_dist = distancias[did]
-                melhor_distrito = did
+    # ================================================================
+    # Cenários: inclusão e remoção de serviços
+    # ================================================================
 
-        if melhor_distrito is None:
-            return None, float("inf"), []
+    def adicionar_servico(self, servico: dict) -> dict:
+        """
+        Adiciona um serviço e atualiza incrementalmente as distâncias ao
+        serviço mais próximo do seu tipo.
 
-        # Obter o caminho
-        _, caminho = self.dijkstra(distrito_id, melhor_distrito)
+        Só os distritos que ficam mais próximos do novo local são visitados
+        (Dijkstra limitado a partir do distrito do serviço).
 
-        # Obter o serviço
-        servico = next(
-            s for s in self.servicos_por_tipo[tipo_servico]
-            if s["distrito_id"] == melhor_distrito
-        )
+        Args:
+            servico: Dicionário com 'nome', 'tipo', 'distrito_id' e,
+                opcionalmente, 'id' e 'leitos'.
+
+        Returns:
+            O serviço normalizado, como armazenado no grafo.
+
+        Raises:
+            ValueError: Se o tipo não for permitido, o distrito não for
+                informado ou não existir, ou o id já estiver em uso.
+        """
+        s_norm = self._normalizar_servico(servico)
+        if s_norm is None:
+            raise ValueError(f"Tipo de serviço não permitido: {servico.get('tipo')!r}")
+        if s_norm.get("distrito_id") is None:
+            raise ValueError("Serviço sem distrito_id.")
+        if s_norm["distrito_id"] not in self.indice_por_id:
+            raise ValueError(f"Distrito inexistente: {s_norm['distrito_id']!r}")
+        if s_norm.get("id") is None:
+            s_norm["id"] = max((s["id"] for s in self.servicos), default=0) + 1
+        elif any(s["id"] == s_norm["id"] for s in self.servicos):
+            raise ValueError(f"ID de serviço já existente: {s_norm['id']!r}")
+        # Mesmas colunas dos serviços lidos do arquivo (0 = sem dado de leitos)
+        s_norm.setdefault("leitos", 0)
+
+        self._indexar_servico(s_norm)
+        self.versao += 1
+
+        estado = self._mais_proximos.get(s_norm["tipo"])
+        if estado is not None:
+            dist, origem, pred = estado
+            i = self.indice_por_id[s_norm["distrito_id"]]
+            if dist[i] > 0.0:
+                dist[i], origem[i], pred[i] = 0.0, i, -1
+                self._relaxar_csr(dist, origem, pred, [(0.0, i)])
+
+        return s_norm
+
+    def remover_servico(self, servico_id: int) -> bool:
+        """
+        Remove um serviço e repara localmente as distâncias do seu tipo.
+
+        Se o distrito deixa de ter o tipo de serviço, apenas os distritos que
+        o tinham como referência são recalculados, a partir da fronteira com
+        o restante do grafo.
+
+        Args:
+            servico_id: ID do serviço.
 
-        return servico, round(menor_dist, 2), caminho
+        Returns:
+            False se o serviço não existir.
+        """
+        servico = next((s for s in self.servicos if s["id"] == servico_id), None)
+        if servico is None:
+            return False
+
+        tipo, did = servico["tipo"], servico["distrito_id"]
+        self.servicos.remove(servico)
+        self.servicos_por_distrito[did].remove(servico)
+        if not self.servicos_por_distrito[did]:
+            del self.servicos_por_distrito[did]
+        self.servicos_por_tipo[tipo].remove(servico)
+        if not self.servicos_por_tipo[tipo]:
+            del self.servicos_por_tipo[tipo]
+        self._tabela_servicos = None
+        self.versao += 1
+
+        ainda_atende = any(s["tipo"] == tipo for s in self.servicos_por_distrito.get(did, []))
+        estado = self._mais_proximos.get(tipo)
+        if estado is None or ainda_atende:
+            return True
+
+        dist, origem, pred = estado
+        removido = self.indice_por_id[did]
+        afetados = [k for k, o in enumerate(origem) if o == removido]
+        for k in afetados:
+            dist[k], origem[k], pred[k] = float("inf"), -1, -1
+
+        # Semear a partir dos vizinhos que continuam atendidos
+        heap: list[tuple[float, int]] = []
+        for v in afetados:
+            vizinhos, pesos = self._vizinhos_csr(v)
+            for u, w in zip(vizinhos, pesos):
+                nd = dist[u] + w
+                if nd < dist[v]:
+                    dist[v], origem[v], pred[v] = nd, origem[u], u
+            if dist[v] < float("inf"):
+                heap.append((dist[v], v))
+        self._relaxar_csr(dist, origem, pred, heap)
+        return True
 
     # ================================================================
     # Métricas de Centralidade e Grau
@@ -251,36 +1469,210 @@ class GrafoSP:
 
     def grau_vertices(self) -> dict[int, int]:
         """Retorna o grau de cada vértice (número de conexões)."""
-        return dict(self.G.degree())
+        return dict(zip(self.ids_por_indice.tolist(), self._graus_csr().tolist()))
+
+    def _graus_csr(self) -> np.ndarray:
+        """Graus a partir do CSR (laços contam duas vezes, como no NetworkX)."""
+        return np.diff(self.csr_indptr) + self._csr_lacos
+
+    def _num_arestas_csr(self) -> int:
+        """Número de arestas distintas (cada laço aparece uma vez no CSR)."""
+        lacos = int(self._csr_lacos.sum())
+        return (len(self.csr_indices) - lacos) // 2 + lacos
+
+    def _num_componentes_csr(self) -> int:
+        """Número de componentes conexas, por busca em largura no CSR."""
+        n = len(self.csr_indptr) - 1
+        indptr = self.csr_indptr.tolist()
+        indices = self.csr_indices.tolist()
+        visitado = bytearray(n)
+        componentes = 0
+        for s in range(n):
+            if visitado[s]:
+                continue
+            componentes += 1
+            visitado[s] = 1
+            fila = [s]
+            while fila:
+                u = fila.pop()
+                for v in indices[indptr[u]:indptr[u + 1]]:
+                    if not visitado[v]:
+                        visitado[v] = 1
+                        fila.append(v)
+        return componentes
 
     def centralidade_grau(self) -> dict[int, float]:
         """Calcula a centralidade de grau de cada vértice."""
         return nx.degree_centrality(self.G)
 
-    def centralidade_proximidade(self) -> dict[int, float]:
-        """Calcula a centralidade de proximidade (closeness) de cada vértice."""
-        return nx.closeness_centrality(self.G, distance="weight")
+    def centralidade_proximidade(self, processos: int | None = None) -> dict[int, float]:
+        """
+        Calcula a centralidade de proximidade (closeness) de cada vértice.
+
+        Reaproveita a matriz de distâncias quando ela já foi calculada;
+        caso contrário executa um Dijkstra por vértice, dividindo as origens
+        entre processos que leem o CSR da memória compartilhada. O resultado
+        fica memorizado até a próxima alteração do grafo.
+
+        Args:
+            processos: Nº de processos (None/1 = sequencial).
+
+        Returns:
+            Dicionário {distrito_id: centralidade}, como em
+            `nx.closeness_centrality(G, distance="weight")`.
+        """
+        chave = ("proximidade",)
+        if chave in self._centralidades:
+            return dict(self._centralidades[chave])
+
+        n = len(self.ids_por_indice)
+        valores = np.zeros(n, dtype=np.float64)
+        if self.matriz_distancias is not None:
+            finitas = np.isfinite(self.matriz_distancias)
+            alcancados = finitas.sum(axis=1)
+            somas = np.where(finitas, self.matriz_distancias, 0.0).sum(axis=1, dtype=np.float64)
+            validos = (somas > 0) & (n > 1)
+            r = alcancados[validos] - 1
+            valores[validos] = r / somas[validos] * r / (n - 1)
+        else:
+            for i, c in self._executar_em_blocos(
+                _proximidade_parcial, _proximidade_bloco, list(range(n)), processos
+            ):
+                valores[i] = c
+
+        resultado = dict(zip(self.ids_por_indice.tolist(), valores.tolist()))
+        self._centralidades[chave] = resultado
+        return dict(resultado)
+
+    def centralidade_intermediacao(
+        self,
+        k: int | None = None,
+        seed: int | None = None,
+        processos: int | None = None,
+    ) -> dict[int, float]:
+        """
+        Calcula a centralidade de intermediação (betweenness) de cada vértice.
+
+        Sem `k`, o cálculo é exato (Brandes ponderado, mesmo resultado do
+        NetworkX). Com `k`, usa apenas k pivôs sorteados como origem; pela
+        desigualdade de Hoeffding, o erro de cada vértice passa de ε com
+        probabilidade no máximo 2·exp(-2·k·ε²) — veja `pivos_necessarios`.
+        O resultado fica memorizado até a próxima alteração do grafo.
+
+        Args:
+            k: Número de pivôs da aproximação (None = exato).
+            seed: Semente do sorteio dos pivôs.
+            processos: Nº de processos para dividir as origens (None/1 = sequencial).
+
+        Returns:
+            Dicionário {distrito_id: centralidade normalizada}.
+        """
+        n = len(self.ids_por_indice)
+        if k is not None and k >= n:
+            k = None
+        chave = ("intermediacao", k, seed if k is not None else None)
+        if chave in self._centralidades:
+            return dict(self._centralidades[chave])
+
+        if k is None:
+            fontes = list(range(n))
+        else:
+            fontes = random.Random(seed).sample(range(n), k)
+        total = self._somar_brandes(fontes, processos)
+
+        # Normalização equivalente à do NetworkX (normalized=True, sem endpoints)
+        if n > 2:
+            if k is None:
+                total *= 1.0 / ((n - 1) * (n - 2))
+            else:
+                escala = np.full(n, 1.0 / (k * (n - 2)))
+                escala[fontes] = 1.0 / ((k - 1) * (n - 2)) if k > 1 else 0.0
+                total *= escala
+
+        resultado = dict(zip(self.ids_por_indice.tolist(), total.tolist()))
+        self._centralidades[chave] = resultado
+        return dict(resultado)
+
+    def _somar_brandes(self, fontes: list[int], processos: int | None) -> np.ndarray:
+        """Executa Brandes para as origens, opcionalmente em vários processos."""
+        if not processos or processos <= 1 or len(fontes) < 2:
+            return _brandes_parcial(self.csr_indptr, self.csr_indices, self.csr_pesos, fontes)
+        parciais = self._executar_em_blocos(
+            _brandes_parcial, _brandes_bloco, fontes, processos, concatenar=False
+        )
+        return np.sum(parciais, axis=0)
 
-    def centralidade_intermediacao(self) -> dict[int, float]:
-        """Calcula a centralidade de intermediação (betweenness) de cada vértice."""
-        return nx.betweenness_centrality(self.G, weight="weight")
+    @contextmanager
+    def _csr_compartilhado(self):
+        """Copia o CSR para blocos de memória compartilhada durante o contexto."""
+        blocos = []
+        spec = []
+        try:
+            for array in (self.csr_indptr, self.csr_indices, self.csr_pesos):
+                bloco = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocos.append(bloco)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=bloco.buf)[:] = array
+                spec.append((bloco.name, array.shape, array.dtype.str))
+            yield spec
+        finally:
+            for bloco in blocos:
+                bloco.close()
+                bloco.unlink()
+
+    def _executar_em_blocos(
+        self, funcao, funcao_bloco, fontes: list[int], processos: int | None,
+        concatenar: bool = True,
+    ) -> list:
+        """
+        Aplica uma função por bloco de origens, em série ou em processos.
+
+        Em paralelo, os filhos recebem apenas os nomes dos blocos de memória
+        compartilhada e os índices das origens (sem serializar o grafo).
+        """
+        if not processos or processos <= 1 or len(fontes) < 2:
+            resultado = funcao(self.csr_indptr, self.csr_indices, self.csr_pesos, fontes)
+            return resultado if concatenar else [resultado]
+
+        # Mais blocos que processos para equilibrar a carga
+        n_blocos = min(len(fontes), processos * 4)
+        blocos = [fontes[i::n_blocos] for i in range(n_blocos)]
+        with self._csr_compartilhado() as spec:
+            with ProcessPoolExecutor(
+                max_workers=processos, initializer=_anexar_csr, initargs=(spec,)
+            ) as executor:
+                parciais = list(executor.map(funcao_bloco, blocos))
+
+        if concatenar:
+            return [item for parcial in parciais for item in parcial]
+        return parciais
+
+    def pivos_necessarios(self, epsilon: float, delta: float = 0.05) -> int:
+        """
+        Nº de pivôs para erro ≤ epsilon em todos os vértices com
+        probabilidade ≥ 1 - delta (Hoeffding + união sobre os n vértices).
+        """
+        n = max(len(self.ids_por_indice), 1)
+        return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
 
     # ================================================================
     # Estatísticas do Grafo
     # ================================================================
 
     def estatisticas(self) -> dict:
-        """Retorna estatísticas gerais do grafo."""
-        graus = [d for _, d in self.G.degree()]
+        """Retorna estatísticas gerais do grafo (calculadas sobre o CSR)."""
+        graus = self._graus_csr().tolist()
+        n = len(graus)
+        m = self._num_arestas_csr()
+        componentes = self._num_componentes_csr()
         return {
-            "num_vertices": self.G.number_of_nodes(),
-            "num_arestas": self.G.number_of_edges(),
+            "num_vertices": n,
+            "num_arestas": m,
             "grau_medio": round(sum(graus) / len(graus), 2) if graus else 0,
             "grau_maximo": max(graus) if graus else 0,
             "grau_minimo": min(graus) if graus else 0,
-            "eh_conexo": nx.is_connected(self.G),
-            "num_componentes": nx.number_connected_components(self.G),
-            "densidade": round(nx.density(self.G), 4),
+            "eh_conexo": componentes == 1,
+            "num_componentes": componentes,
+            "densidade": round(2 * m / (n * (n - 1)), 4) if n > 1 else 0,
         }
 
     # ================================================================
@@ -306,8 +1698,8 @@ class GrafoSP:
         )
 
     def get_tipos_servico(self) -> list[str]:
-        """Retorna os tipos de serviço disponíveis."""
-        return sorted(self.servicos_por_tipo.keys())
+        """Retorna os tipos de serviço disponíveis (carrega só os serviços)."""
+        return self._resumo_servicos()["tipos_servico"]
 
     def contar_servicos_distrito(self, distrito_id: int) -> dict[str, int]:
         """Conta os serviços por tipo em um distrito."""
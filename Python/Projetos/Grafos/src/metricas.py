@@ -8,15 +8,63 @@ Métricas disponíveis:
 - Score de cobertura por distrito
 - Ranking de cobertura
 - Média da cidade
-- Identificação de distritos com menor cobertura
+- Identificação de distritos com menor cobertura (seleção parcial top-k)
+- Cálculo em lote (vetorizado) por tipo de serviço, com cache por tipo
+- Ranking em fluxo e exportação incremental (CSV / Parquet)
 """
 
 from __future__ import annotations
 
+import csv
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
 import pandas as pd
+from src.arquivos import caminho_atomico
 from src.grafo import GrafoSP
 
 
+# Distância (km) a partir da qual o score de acessibilidade é 0
+DISTANCIA_SCORE_ZERO = 20.0
+
+# Percentis de distância reportados no cálculo em lote
+PERCENTIS_LOTE = (25, 50, 75, 90)
+
+# Colunas do ranking (DataFrame, fluxo e arquivos exportados)
+COLUNAS_RANKING = (
+    "posicao", "distrito_id", "distrito", "zona", "populacao", "distancia_km", "score",
+)
+
+
+def _arredondar_decimo(valores: np.ndarray) -> np.ndarray:
+    """
+    round(x, 1) do Python, elemento a elemento, sem laço em Python.
+
+    np.round(x, 1) calcula rint(x * 10) / 10, e o erro do produto x * 10
+    muda o resultado em casos de meio (ex.: 94.45). Aqui 10x é obtido sem
+    erro como s + erro (8x e 2x são exatos; a soma usa TwoSum), e a
+    comparação com o meio usa esse valor exato. Empates exatos (x.25, x.75)
+    vão para o par, como no round().
+
+    Args:
+        valores: Array float.
+
+    Returns:
+        Array float com cada valor arredondado para uma casa decimal.
+    """
+    a = valores * 8.0
+    b = valores * 2.0
+    s = a + b
+    bb = s - a
+    erro = (a - (s - bb)) + (b - bb)  # 10x == s + erro, exatamente
+    piso = np.floor(s)
+    # Sinal de (fração exata - 0.5); s - piso e a subtração de 0.5 são exatas
+    meio = ((s - piso) - 0.5) + erro
+    sobe = (meio > 0) | ((meio == 0) & (np.fmod(piso, 2.0) != 0))
+    return (piso + sobe) / 10.0
+
+
 class MetricasAcessibilidade:
     """
     Calcula métricas de cobertura territorial para os distritos de São Paulo.
@@ -34,6 +82,16 @@ class MetricasAcessibilidade:
         """
         self.grafo = grafo
 
+        # Resultados de calcular_lote por tipo de serviço, válidos enquanto
+        # grafo.versao for igual a _versao_cache
+        self._cache: dict[str, dict] = {}
+        self._versao_cache = grafo.versao
+
+    def limpar_cache(self):
+        """Descarta os resultados memorizados."""
+        self._cache.clear()
+        self._versao_cache = self.grafo.versao
+
     def distancia_servico_mais_proximo(self, tipo_servico: str) -> dict[int, float]:
         """
         Calcula a distância de cada distrito ao serviço mais próximo.
@@ -44,11 +102,8 @@ class MetricasAcessibilidade:
         Returns:
             Dicionário {distrito_id: distância_km}.
         """
-        distancias = {}
-        for did in self.grafo.distritos:
-            _, dist, _ = self.grafo.servico_mais_proximo(did, tipo_servico)
-            distancias[did] = dist
-        return distancias
+        distancias = self.calcular_lote(tipo_servico)["distancias"]
+        return dict(zip(self.grafo.ids_por_indice.tolist(), distancias.tolist()))
 
     def score_acessibilidade(self, distrito_id: int, tipo_servico: str) -> float:
         """
@@ -65,7 +120,11 @@ class MetricasAcessibilidade:
             Score de 0 a 100.
         """
         _, distancia, _ = self.grafo.servico_mais_proximo(distrito_id, tipo_servico)
+        return self.score_distancia(distancia)
 
+    @staticmethod
+    def score_distancia(distancia: float) -> float:
+        """Score de 0 a 100 correspondente a uma distância em km."""
         if distancia == 0:
             return 100.0
         if distancia == float("inf"):
@@ -73,10 +132,122 @@ class MetricasAcessibilidade:
 
         # Score inversamente proporcional à distância
         # Referência: 20 km = score 0
-        max_dist = 20.0
+        max_dist = DISTANCIA_SCORE_ZERO
         score = max(0, (1 - distancia / max_dist)) * 100
         return round(score, 1)
 
+    @staticmethod
+    def scores_vetor(distancias: np.ndarray) -> np.ndarray:
+        """
+        Versão vetorizada de `score_acessibilidade` sobre um vetor de distâncias.
+
+        Args:
+            distancias: Distâncias em km (inf = sem serviço acessível).
+
+        Returns:
+            Array de scores de 0 a 100.
+        """
+        distancias = np.asarray(distancias, dtype=float)
+        with np.errstate(invalid="ignore"):
+            brutos = np.maximum(0.0, 1.0 - distancias / DISTANCIA_SCORE_ZERO) * 100
+        # Mesmo arredondamento de round(), para empatar com score_acessibilidade
+        scores = _arredondar_decimo(brutos)
+        scores[distancias == 0] = 100.0
+        scores[np.isinf(distancias)] = 0.0
+        return scores
+
+    def vetor_distancias(self, tipo_servico: str) -> np.ndarray:
+        """
+        Distância de cada distrito ao serviço mais próximo, como array.
+
+        A ordem segue `grafo.ids_por_indice`.
+
+        Args:
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
+
+        Returns:
+            Array float com distâncias em km (inf se inacessível).
+        """
+        # Uma única busca com múltiplas origens cobre todos os distritos
+        alcancados, _, _ = self.grafo.servicos_mais_proximos(tipo_servico)
+        return np.fromiter(
+            (
+                round(alcancados[did], 2) if did in alcancados else float("inf")
+                for did in self.grafo.ids_por_indice.tolist()
+            ),
+            dtype=float,
+            count=len(self.grafo.ids_por_indice),
+        )
+
+    def calcular_lote(self, tipo_servico: str) -> dict:
+        """
+        Calcula de uma vez todas as métricas de um tipo de serviço.
+
+        Executa uma única busca no grafo e deriva scores, média, mediana,
+        percentis e ranking com operações vetorizadas. O resultado fica
+        memorizado por tipo até a próxima alteração do grafo.
+
+        Args:
+            tipo_servico: Tipo de serviço.
+
+        Returns:
+            Dicionário com 'distancias' e 'scores' (arrays na ordem de
+            `grafo.ids_por_indice`), 'ranking' (DataFrame), 'posicoes'
+            ({distrito_id: posição}), 'media' (mesmo formato de
+            `media_cidade`) e 'percentis' ({p: distância_km}).
+        """
+        if self._versao_cache != self.grafo.versao:
+            self.limpar_cache()
+        if tipo_servico in self._cache:
+            return self._cache[tipo_servico]
+
+        ids = self.grafo.ids_por_indice
+        distancias = self.vetor_distancias(tipo_servico)
+        scores = self.scores_vetor(distancias)
+
+        infos = [self.grafo.distritos[did] for did in ids.tolist()]
+        df = pd.DataFrame({
+            "distrito_id": ids,
+            "distrito": [d["nome"] for d in infos],
+            "zona": [d["zona"] for d in infos],
+            "populacao": [d["populacao"] for d in infos],
+            "distancia_km": distancias,
+            "score": scores,
+        })
+        df = df.sort_values("distancia_km", ascending=True)
+        df["posicao"] = np.arange(1, len(df) + 1)
+        df = df[list(COLUNAS_RANKING)]
+        ranking = df.reset_index(drop=True)
+        posicoes = dict(zip(ranking["distrito_id"].tolist(), ranking["posicao"].tolist()))
+
+        finitas = distancias[np.isfinite(distancias)]
+        if finitas.size == 0:
+            media = {"media_distancia": 0, "score_medio": 0, "mediana_distancia": 0}
+            percentis = {}
+        else:
+            media = {
+                "media_distancia": round(float(finitas.mean()), 2),
+                "score_medio": round(float(scores.mean()), 1),
+                "mediana_distancia": round(float(np.median(finitas)), 2),
+                "melhor_distancia": round(float(finitas.min()), 2),
+                "pior_distancia": round(float(finitas.max()), 2),
+            }
+            percentis = {
+                p: round(float(v), 2)
+                for p, v in zip(PERCENTIS_LOTE, np.percentile(finitas, PERCENTIS_LOTE))
+            }
+
+        lote = {
+            "distancias": distancias,
+            "scores": scores,
+            "ranking": ranking,
+            "posicoes": posicoes,
+            "media": media,
+            "percentis": percentis,
+        }
+        self._cache[tipo_servico] = lote
+        return lote
+
     def ranking(self, tipo_servico: str) -> pd.DataFrame:
         """
         Gera ranking de distritos por cobertura territorial para um tipo de serviço.
@@ -87,25 +258,123 @@ class MetricasAcessibilidade:
         Returns:
             DataFrame com colunas: posição, distrito, zona, distância, score.
         """
-        dados = []
-        for did, d in self.grafo.distritos.items():
-            _, dist, _ = self.grafo.servico_mais_proximo(did, tipo_servico)
-            score = self.score_acessibilidade(did, tipo_servico)
-            dados.append({
+        return self.calcular_lote(tipo_servico)["ranking"].copy()
+
+    def iterar_ranking(self, tipo_servico: str) -> Iterator[dict]:
+        """
+        Ranking em fluxo: produz cada linha assim que a busca fixa o distrito.
+
+        As linhas saem em ordem crescente de distância diretamente do heap do
+        Dijkstra multi-origem, sem montar o ranking inteiro em memória; a
+        primeira linha fica disponível logo após a primeira fixação. Entre
+        distritos empatados a ordem pode diferir da de `ranking`.
+
+        Args:
+            tipo_servico: Tipo de serviço.
+
+        Yields:
+            Dicionários com as chaves de COLUNAS_RANKING.
+        """
+        distritos = self.grafo.distritos
+        for posicao, (did, dist, _) in enumerate(
+            self.grafo.iterar_mais_proximos(tipo_servico), start=1
+        ):
+            d = distritos[did]
+            distancia = round(dist, 2)
+            yield {
+                "posicao": posicao,
                 "distrito_id": did,
                 "distrito": d["nome"],
                 "zona": d["zona"],
                 "populacao": d["populacao"],
-                "distancia_km": dist,
-                "score": score,
-            })
+                "distancia_km": distancia,
+                "score": self.score_distancia(distancia),
+            }
+
+    def exportar_ranking(
+        self,
+        tipo_servico: str,
+        caminho: str | Path,
+        formato: str | None = None,
+        tamanho_lote: int = 50_000,
+    ) -> int:
+        """
+        Grava o ranking em arquivo de forma incremental, a partir do fluxo.
 
-        df = pd.DataFrame(dados)
-        df = df.sort_values("distancia_km", ascending=True)
-        df["posicao"] = range(1, len(df) + 1)
-        df = df[["posicao", "distrito_id", "distrito", "zona",
-                  "populacao", "distancia_km", "score"]]
-        return df.reset_index(drop=True)
+        A memória usada não depende do número de distritos (além do estado
+        da busca): o CSV é escrito linha a linha e o Parquet em grupos de
+        `tamanho_lote` linhas. O arquivo é gravado em um temporário e só
+        substitui o destino ao final.
+
+        Args:
+            tipo_servico: Tipo de serviço.
+            caminho: Arquivo de saída.
+            formato: 'csv' ou 'parquet' (padrão: deduzido da extensão).
+            tamanho_lote: Linhas por grupo no Parquet.
+
+        Returns:
+            Número de linhas gravadas.
+
+        Raises:
+            ValueError: Se o formato for desconhecido.
+            ImportError: Se o formato for Parquet e o pyarrow não estiver instalado.
+        """
+        caminho = Path(caminho)
+        formato = (formato or caminho.suffix.lstrip(".")).lower()
+        if formato not in ("csv", "parquet"):
+            raise ValueError(f"Formato de exportação desconhecido: {formato!r}")
+
+        linhas = self.iterar_ranking(tipo_servico)
+        with caminho_atomico(caminho) as temporario:
+            if formato == "csv":
+                total = self._exportar_csv(linhas, temporario)
+            else:
+                total = self._exportar_parquet(linhas, temporario, tamanho_lote)
+        return total
+
+    @staticmethod
+    def _exportar_csv(linhas: Iterator[dict], caminho: Path) -> int:
+        """Escreve as linhas do ranking em CSV, uma a uma."""
+        total = 0
+        with open(caminho, "w", encoding="utf-8", newline="") as f:
+            escritor = csv.writer(f)
+            escritor.writerow(COLUNAS_RANKING)
+            for linha in linhas:
+                escritor.writerow([linha[c] for c in COLUNAS_RANKING])
+                total += 1
+        return total
+
+    @staticmethod
+    def _exportar_parquet(linhas: Iterator[dict], caminho: Path, tamanho_lote: int) -> int:
+        """Escreve as linhas do ranking em Parquet, um grupo de linhas por lote."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Exportação em Parquet requer o pacote pyarrow.") from e
+
+        esquema = pa.schema([
+            ("posicao", pa.int64()),
+            ("distrito_id", pa.int64()),
+            ("distrito", pa.string()),
+            ("zona", pa.string()),
+            ("populacao", pa.int64()),
+            ("distancia_km", pa.float64()),
+            ("score", pa.float64()),
+        ])
+        total = 0
+        with pq.ParquetWriter(caminho, esquema) as escritor:
+            lote: list[dict] = []
+            for linha in linhas:
+                lote.append(linha)
+                if len(lote) >= tamanho_lote:
+                    escritor.write_batch(pa.RecordBatch.from_pylist(lote, schema=esquema))
+                    total += len(lote)
+                    lote = []
+            if lote or total == 0:
+                escritor.write_batch(pa.RecordBatch.from_pylist(lote, schema=esquema))
+                total += len(lote)
+        return total
 
     def media_cidade(self, tipo_servico: str) -> dict:
         """
@@ -117,29 +386,7 @@ class MetricasAcessibilidade:
         Returns:
             Dicionário com média de distância, score médio, mediana.
         """
-        distancias = self.distancia_servico_mais_proximo(tipo_servico)
-
-        # Filtrar infinitos
-        dists_finitas = [d for d in distancias.values() if d < float("inf")]
-
-        if not dists_finitas:
-            return {"media_distancia": 0, "score_medio": 0, "mediana_distancia": 0}
-
-        dists_finitas.sort()
-        n = len(dists_finitas)
-        mediana = dists_finitas[n // 2] if n % 2 == 1 else (
-            dists_finitas[n // 2 - 1] + dists_finitas[n // 2]) / 2
-
-        scores = [self.score_acessibilidade(did, tipo_servico)
-                  for did in distancias]
-
-        return {
-            "media_distancia": round(sum(dists_finitas) / n, 2),
-            "score_medio": round(sum(scores) / len(scores), 1),
-            "mediana_distancia": round(mediana, 2),
-            "melhor_distancia": round(min(dists_finitas), 2),
-            "pior_distancia": round(max(dists_finitas), 2),
-        }
+        return dict(self.calcular_lote(tipo_servico)["media"])
 
     def distritos_isolados(
         self, tipo_servico: str, percentil: float = 0.8
@@ -154,36 +401,96 @@ class MetricasAcessibilidade:
         Returns:
             Lista de dicionários com informações dos distritos isolados.
         """
-        distancias = self.distancia_servico_mais_proximo(tipo_servico)
+        df = self.isolados_top_k(tipo_servico, percentil)
+        return df[["distrito_id", "distrito", "zona", "populacao",
+                   "distancia_km", "score"]].to_dict("records")
 
-        # Filtrar infinitos
-        dists_finitas = sorted(
-            [(did, d) for did, d in distancias.items() if d < float("inf")],
-            key=lambda x: x[1],
-            reverse=True
-        )
+    def _top_k_distancias(self, distancias: np.ndarray, k: int) -> np.ndarray:
+        """
+        Índices das k maiores distâncias finitas, da maior para a menor.
 
-        if not dists_finitas:
-            return []
+        Seleção parcial (argpartition) em O(n); só os k escolhidos são
+        ordenados. Empates são resolvidos pela ordem dos índices, como em
+        uma ordenação estável decrescente.
+        """
+        finitos = np.flatnonzero(np.isfinite(distancias))
+        k = min(k, finitos.size)
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+
+        valores = distancias[finitos]
+        corte = np.partition(valores, finitos.size - k)[finitos.size - k]
+        acima = finitos[valores > corte]
+        empatados = finitos[valores == corte][: k - acima.size]
+        escolhidos = np.concatenate([acima, empatados])
+        return escolhidos[np.lexsort((escolhidos, -distancias[escolhidos]))]
+
+    def isolados_top_k(
+        self,
+        tipos_servico: str | list[str],
+        percentis: float | list[float] = 0.8,
+    ) -> pd.DataFrame:
+        """
+        Distritos isolados para vários tipos de serviço e percentis de uma vez.
 
-        # Corte pelo percentil
-        n_isolados = max(1, int(len(dists_finitas) * (1 - percentil)))
-        isolados = dists_finitas[:n_isolados]
+        Usa os vetores de distância e score já calculados em lote; nenhuma
+        busca extra no grafo é feita. Para cada tipo, seleciona só as k
+        maiores distâncias do maior corte pedido, e os demais percentis são
+        prefixos dessa seleção.
 
-        resultado = []
-        for did, dist in isolados:
-            d = self.grafo.distritos[did]
-            score = self.score_acessibilidade(did, tipo_servico)
-            resultado.append({
-                "distrito_id": did,
-                "distrito": d["nome"],
-                "zona": d["zona"],
-                "populacao": d["populacao"],
-                "distancia_km": round(dist, 2),
-                "score": score,
-            })
+        Args:
+            tipos_servico: Um tipo ou lista de tipos de serviço.
+            percentis: Um percentil de corte ou lista (0.8 = top 20% mais
+                distantes).
 
-        return resultado
+        Returns:
+            DataFrame com tipo_servico, percentil, posicao, distrito_id,
+            distrito, zona, populacao, distancia_km, score e
+            populacao_acumulada (soma da população isolada até a linha,
+            dentro do mesmo tipo e percentil).
+        """
+        if isinstance(tipos_servico, str):
+            tipos_servico = [tipos_servico]
+        if isinstance(percentis, (int, float)):
+            percentis = [percentis]
+
+        ids = self.grafo.ids_por_indice
+        infos = [self.grafo.distritos[did] for did in ids.tolist()]
+        nomes = np.array([d["nome"] for d in infos], dtype=object)
+        zonas = np.array([d["zona"] for d in infos], dtype=object)
+        populacao = np.array([d["populacao"] for d in infos], dtype=np.int64)
+
+        partes = []
+        for tipo in tipos_servico:
+            lote = self.calcular_lote(tipo)
+            distancias = lote["distancias"]
+            n_finitos = int(np.isfinite(distancias).sum())
+            if n_finitos == 0:
+                continue
+
+            tamanhos = {p: max(1, int(n_finitos * (1 - p))) for p in percentis}
+            ordem = self._top_k_distancias(distancias, max(tamanhos.values()))
+            for p in percentis:
+                sel = ordem[:tamanhos[p]]
+                partes.append(pd.DataFrame({
+                    "tipo_servico": tipo,
+                    "percentil": p,
+                    "posicao": np.arange(1, len(sel) + 1),
+                    "distrito_id": ids[sel],
+                    "distrito": nomes[sel],
+                    "zona": zonas[sel],
+                    "populacao": populacao[sel],
+                    "distancia_km": distancias[sel],
+                    "score": lote["scores"][sel],
+                    "populacao_acumulada": np.cumsum(populacao[sel]),
+                }))
+
+        if not partes:
+            return pd.DataFrame(columns=[
+                "tipo_servico", "percentil", "posicao", "distrito_id", "distrito",
+                "zona", "populacao", "distancia_km", "score", "populacao_acumulada",
+            ])
+        return pd.concat(partes, ignore_index=True)
 
     def comparar_com_media(self, distrito_id: int, tipo_servico: str) -> dict:
         """
@@ -196,16 +503,12 @@ class MetricasAcessibilidade:
         Returns:
             Dicionário com comparação detalhada.
         """
-        _, dist_distrito, _ = self.grafo.servico_mais_proximo(
-            distrito_id, tipo_servico
-        )
-        score_distrito = self.score_acessibilidade(distrito_id, tipo_servico)
-        media = self.media_cidade(tipo_servico)
-
-        ranking_df = self.ranking(tipo_servico)
-        posicao = ranking_df[
-            ranking_df["distrito_id"] == distrito_id
-        ]["posicao"].values[0]
+        lote = self.calcular_lote(tipo_servico)
+        i = self.grafo.indice_por_id[distrito_id]
+        dist_distrito = float(lote["distancias"][i])
+        score_distrito = float(lote["scores"][i])
+        media = lote["media"]
+        posicao = lote["posicoes"][distrito_id]
 
         diff_dist = round(dist_distrito - media["media_distancia"], 2)
         diff_score = round(score_distrito - media["score_medio"], 1)
@@ -0,0 +1,157 @@
+"""
+SPGraph - Módulo de Otimização de Localização
+==============================================
+Escolhe distritos para novos serviços de saúde (UBS, UPA ou hospital SUS)
+de forma a melhorar a acessibilidade ponderada pela população.
+
+Objetivos disponíveis:
+- p-mediana: reduzir a soma de população × distância ao serviço mais próximo
+- Cobertura máxima: aumentar a população a até `raio_km` de um serviço
+
+A seleção usa o algoritmo guloso preguiçoso (CELF) sobre a matriz de
+distâncias entre todos os pares do GrafoSP. O grafo é não orientado, então
+a matriz é simétrica e tudo é lido por linhas (contíguas no memory-map).
+"""
+
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+from src.grafo import GrafoSP
+
+
+OBJETIVOS = ("p_mediana", "cobertura")
+
+
+class OtimizadorLocalizacao:
+    """
+    Seleciona k distritos para receber um novo serviço de um tipo.
+
+    Os ganhos marginais de cada candidato são memorizados e só são
+    recalculados quando o candidato chega ao topo do heap (CELF), o que
+    evita reavaliar todos os candidatos a cada escolha.
+    """
+
+    def __init__(self, grafo: GrafoSP):
+        """
+        Inicializa com uma instância do grafo.
+
+        Args:
+            grafo: Instância de GrafoSP já construída.
+        """
+        self.grafo = grafo
+        # (versao_topologia, matriz) lida para o otimizador
+        self._cache_matriz: tuple[int, np.ndarray] | None = None
+
+    def _matriz(self) -> np.ndarray:
+        """
+        Matriz de distâncias do grafo.
+
+        Usa a do grafo se o modo matricial já estiver ativo; senão guarda um
+        handle próprio (GrafoSP.ler_matriz), sem mudar o modo de consulta do
+        grafo compartilhado. O handle é refeito quando a topologia muda.
+        """
+        if self.grafo.matriz_distancias is not None:
+            return self.grafo.matriz_distancias
+        versao = self.grafo.versao_topologia
+        if self._cache_matriz is None or self._cache_matriz[0] != versao:
+            self._cache_matriz = (versao, self.grafo.ler_matriz()[0])
+        return self._cache_matriz[1]
+
+    def _distancias_atuais(self, D: np.ndarray, tipo_servico: str) -> np.ndarray:
+        """Distância de cada distrito ao serviço existente mais próximo."""
+        fontes = self.grafo.tabela_servicos.distritos_com(tipo_servico)
+        if fontes.size == 0:
+            return np.full(D.shape[0], np.inf)
+        return np.asarray(D[fontes], dtype=float).min(axis=0)
+
+    def escolher_locais(
+        self,
+        tipo_servico: str,
+        k: int,
+        objetivo: str = "p_mediana",
+        raio_km: float = 5.0,
+        candidatos: list[int] | None = None,
+    ) -> list[dict]:
+        """
+        Escolhe até k distritos para novos serviços do tipo informado.
+
+        Args:
+            tipo_servico: Tipo de serviço ('ubs', 'upa' ou 'hospital_sus').
+            k: Número de novos locais.
+            objetivo: 'p_mediana' ou 'cobertura'.
+            raio_km: Raio de cobertura (usado apenas no objetivo 'cobertura').
+            candidatos: IDs de distritos elegíveis (padrão: todos).
+
+        Returns:
+            Lista, na ordem de escolha, de dicionários com distrito_id,
+            distrito, zona, ganho (km·habitante ou habitantes cobertos) e
+            ganho_acumulado. A lista para antes de k se nenhum candidato
+            trouxer ganho positivo.
+
+        Raises:
+            ValueError: Se o objetivo for desconhecido.
+        """
+        if objetivo not in OBJETIVOS:
+            raise ValueError(f"Objetivo desconhecido: {objetivo!r}")
+
+        D = self._matriz()
+        ids = self.grafo.ids_por_indice.tolist()
+        populacao = np.array(
+            [self.grafo.distritos[did]["populacao"] for did in ids], dtype=float
+        )
+        atual = self._distancias_atuais(D, tipo_servico)
+
+        if objetivo == "p_mediana":
+            # Distritos sem serviço alcançável contam com a maior distância finita
+            finitas = D[np.isfinite(D)]
+            teto = float(finitas.max()) if finitas.size else 0.0
+            estado = np.minimum(atual, teto)
+        else:
+            estado = atual <= raio_km
+
+        if candidatos is None:
+            idx_candidatos = list(range(len(ids)))
+        else:
+            idx_candidatos = [self.grafo.indice_por_id[c] for c in candidatos]
+
+        def ganho(j: int) -> float:
+            linha = np.asarray(D[j], dtype=float)
+            if objetivo == "p_mediana":
+                return float(populacao @ np.maximum(0.0, estado - linha))
+            return float(populacao[(linha <= raio_km) & ~estado].sum())
+
+        # Ganhos iniciais; a rodada indica quando o ganho foi calculado
+        heap = [(-ganho(j), j, 0) for j in idx_candidatos]
+        heapq.heapify(heap)
+
+        escolhidos: list[dict] = []
+        acumulado = 0.0
+        rodada = 0
+        while heap and len(escolhidos) < k:
+            ganho_neg, j, calculado_em = heapq.heappop(heap)
+            if calculado_em != rodada:
+                heapq.heappush(heap, (-ganho(j), j, rodada))
+                continue
+            if -ganho_neg <= 0:
+                break
+
+            linha = np.asarray(D[j], dtype=float)
+            if objetivo == "p_mediana":
+                estado = np.minimum(estado, linha)
+            else:
+                estado = estado | (linha <= raio_km)
+
+            acumulado += -ganho_neg
+            d = self.grafo.distritos[ids[j]]
+            escolhidos.append({
+                "distrito_id": ids[j],
+                "distrito": d["nome"],
+                "zona": d["zona"],
+                "ganho": round(-ganho_neg, 2),
+                "ganho_acumulado": round(acumulado, 2),
+            })
+            rodada += 1
+
+        return escolhidos
@@ -0,0 +1,87 @@
+"""
+SPGraph - Tabela Colunar de Serviços
+=====================================
+Representação em colunas NumPy dos serviços de saúde do GrafoSP,
+com índices pré-calculados por tipo e por distrito.
+
+Estruturas:
+- Colunas id, código do tipo, índice do distrito e leitos
+- Tabela de nomes internados (cada nome distinto guardado uma vez)
+- Máscara booleana por tipo sobre os índices de distrito
+- Matriz (tipo, distrito) -> primeira linha com aquele serviço
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class TabelaServicos:
+    """
+    Serviços de saúde em formato colunar.
+
+    A linha k corresponde ao k-ésimo serviço da lista de origem, de modo
+    que o registro completo continua acessível por `GrafoSP.servicos[k]`.
+    """
+
+    def __init__(self, servicos: list[dict], indice_por_id: dict[int, int]):
+        """
+        Monta a tabela a partir da lista de serviços normalizados.
+
+        Args:
+            servicos: Lista de dicionários (id, nome, tipo, distrito_id, leitos).
+            indice_por_id: Mapa distrito_id -> índice do vértice no grafo.
+                Serviços em distritos fora do grafo ficam com índice -1.
+        """
+        n_distritos = len(indice_por_id)
+        self.tipos: list[str] = sorted({s["tipo"] for s in servicos})
+        self.codigo_tipo: dict[str, int] = {t: c for c, t in enumerate(self.tipos)}
+
+        n = len(servicos)
+        self.ids = np.fromiter((s["id"] for s in servicos), dtype=np.int64, count=n)
+        self.tipo = np.fromiter(
+            (self.codigo_tipo[s["tipo"]] for s in servicos), dtype=np.int8, count=n
+        )
+        self.distrito = np.fromiter(
+            (indice_por_id.get(s["distrito_id"], -1) for s in servicos), dtype=np.int32, count=n
+        )
+        self.leitos = np.fromiter(
+            (s.get("leitos") or 0 for s in servicos), dtype=np.int32, count=n
+        )
+
+        # Nomes internados: cada nome distinto aparece uma vez
+        self.nomes: list[str] = []
+        posicao_nome: dict[str, int] = {}
+        nome_idx = np.empty(n, dtype=np.int32)
+        for k, s in enumerate(servicos):
+            nome = s.get("nome", "")
+            if nome not in posicao_nome:
+                posicao_nome[nome] = len(self.nomes)
+                self.nomes.append(nome)
+            nome_idx[k] = posicao_nome[nome]
+        self.nome = nome_idx
+
+        # primeiro[tipo, distrito] = primeira linha do tipo no distrito (-1 se não há)
+        self.primeiro = np.full((len(self.tipos), n_distritos), -1, dtype=np.int32)
+        validos = np.flatnonzero(self.distrito >= 0)
+        # Percorrer de trás para frente faz a primeira ocorrência prevalecer
+        ordem = validos[::-1]
+        self.primeiro[self.tipo[ordem], self.distrito[ordem]] = ordem
+
+        self.mascaras: dict[str, np.ndarray] = {
+            t: self.primeiro[c] >= 0 for t, c in self.codigo_tipo.items()
+        }
+
+    def linha_em(self, tipo: str, distrito_idx: int) -> int:
+        """Primeira linha com o tipo no distrito (índice do vértice), ou -1."""
+        codigo = self.codigo_tipo.get(tipo)
+        if codigo is None:
+            return -1
+        return int(self.primeiro[codigo, distrito_idx])
+
+    def distritos_com(self, tipo: str) -> np.ndarray:
+        """Índices (ordenados) dos distritos que têm o tipo de serviço."""
+        mascara = self.mascaras.get(tipo)
+        if mascara is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(mascara)
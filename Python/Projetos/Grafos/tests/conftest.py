@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite `from src.grafo import ...` rodando o pytest de qualquer diretório
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
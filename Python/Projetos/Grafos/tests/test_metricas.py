@@ -0,0 +1,20 @@
+"""Scores vetorizados contra o cálculo escalar."""
+
+import numpy as np
+
+from src.metricas import MetricasAcessibilidade
+
+
+def test_scores_vetor_arredonda_como_score_distancia():
+    rng = np.random.default_rng(0)
+    # Distâncias com duas casas (como as do grafo) geram muitos casos de meio
+    distancias = np.concatenate([
+        np.round(rng.uniform(0, 25, 20_000), 2),
+        rng.uniform(0, 25, 20_000),
+        [0.0, 1.11, 5.0, 15.0, 20.0, 21.0, np.inf],
+    ])
+
+    vetor = MetricasAcessibilidade.scores_vetor(distancias)
+    escalar = [MetricasAcessibilidade.score_distancia(d) for d in distancias.tolist()]
+
+    np.testing.assert_array_equal(vetor, escalar)
@@ -0,0 +1,85 @@
+"""Ida e volta do snapshot binário com registros heterogêneos."""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.grafo import GrafoSP
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for nome in ("ubs_vertices.json", "adjacencias.json", "servicos.json"):
+        shutil.copy(DATA_DIR / nome, tmp_path / nome)
+    return tmp_path
+
+
+def _editar(caminho: Path, editar):
+    registros = json.loads(caminho.read_text(encoding="utf-8"))
+    editar(registros)
+    caminho.write_text(json.dumps(registros, ensure_ascii=False), encoding="utf-8")
+
+
+def _heterogeneos(servicos):
+    del servicos[0]["leitos"]                   # chave ausente
+    servicos[1]["leitos"] = None                # valor nulo
+    servicos[2]["telefone"] = "(11) 5555-0000"  # chave só em um registro
+    servicos[3]["leitos"] = "12"                # tipo misto na coluna
+    servicos[4]["extra"] = {"turnos": [1, 2]}   # valor composto
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_snapshot_preserva_registros_heterogeneos(data_dir, lazy):
+    _editar(data_dir / "servicos.json", _heterogeneos)
+    _editar(data_dir / "ubs_vertices.json", lambda v: v[0].update(apelido="Centro"))
+
+    original = GrafoSP(data_dir=data_dir)
+    caminho = original.salvar_snapshot(data_dir / "grafo.npz")
+    copia = GrafoSP.carregar_snapshot(caminho, lazy=lazy)
+
+    assert copia.servicos == original.servicos
+    assert copia.distritos == original.distritos
+    assert "leitos" not in copia.servicos[0]
+    assert copia.servicos[1]["leitos"] is None
+    assert copia.servicos[2]["telefone"] == "(11) 5555-0000"
+    assert copia.cabecalho() == original.cabecalho()
+
+
+def test_snapshot_homogeneo_usa_colunas_nativas(data_dir):
+    original = GrafoSP(data_dir=data_dir)
+    caminho = original.salvar_snapshot(data_dir / "grafo.npz")
+    with np.load(caminho) as dados:
+        meta = json.loads(str(dados["meta"]))
+
+    colunas = meta["colunas_servicos"]["colunas"]
+    assert not any(col["json"] or col["estado"] for col in colunas)
+    assert GrafoSP.carregar_snapshot(caminho).servicos == original.servicos
+
+
+def test_carregador_que_falha_pode_ser_repetido(data_dir):
+    original = GrafoSP(data_dir=data_dir)
+    caminho = original.salvar_snapshot(data_dir / "grafo.npz")
+    copia = GrafoSP.carregar_snapshot(caminho, lazy=True)
+
+    carregador = copia._carregadores["servicos"]
+    chamadas = []
+
+    def falha_uma_vez():
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            copia.servicos = []  # parte definida pela metade
+            raise OSError("leitura interrompida")
+        carregador()
+
+    copia._carregadores["servicos"] = falha_uma_vez
+    with pytest.raises(OSError):
+        copia.servicos_por_tipo
+    assert "servicos" not in copia.__dict__
+
+    assert copia.servicos == original.servicos
+    assert "servicos" not in copia._carregadores